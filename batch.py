@@ -0,0 +1,73 @@
+import os
+from itertools import islice, product
+from multiprocessing import Pool
+from typing import NamedTuple
+
+from mach_cache import load_program
+from macro import MacroRunner
+
+# Inputs sent to a worker per task, large enough to amortize IPC
+CHUNK_SIZE = 512
+
+
+class BatchResult(NamedTuple):
+    input: str
+    status: str
+    state: str
+    accepted: bool
+    steps: int
+
+
+# Per-worker runner, set once by the pool initializer
+_runner = None
+_max_steps = None
+
+
+def _init_worker(program, max_steps, accelerate=False) -> None:
+    global _runner, _max_steps
+    # A path means "map the cached program", which shares its pages between workers
+    program = load_program(program) if isinstance(program, str) else program
+    _runner = MacroRunner(program) if accelerate else program
+    _max_steps = max_steps
+
+
+def _run_chunk(inputs) -> list:
+    run = _runner.run
+    out = []
+    for text in inputs:
+        r = run(text, _max_steps)
+        out.append(BatchResult(text, r.status, r.state, r.accepted, r.steps))
+    return out
+
+
+def _chunks(inputs, size):
+    it = iter(inputs)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def all_strings(alphabet, max_len):
+    """Every string over `alphabet` of length 0..max_len, shortest first."""
+    for n in range(max_len + 1):
+        for t in product(alphabet, repeat=n):
+            yield "".join(t)
+
+
+def run_batch(program, inputs, max_steps=None, workers=None, chunksize=CHUNK_SIZE, accelerate=False):
+    """Run one machine over many inputs, yielding results in input order.
+
+    `program` is a compiled Program or the path of a .mach file. Either way
+    each worker receives it once through the pool initializer rather than
+    with every task.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(program, max_steps, accelerate)
+        for chunk in _chunks(inputs, chunksize):
+            yield from _run_chunk(chunk)
+        return
+    if isinstance(program, str):
+        load_program(program)  # build the cache once before the workers map it
+    with Pool(workers, _init_worker, (program, max_steps, accelerate)) as pool:
+        for results in pool.imap(_run_chunk, _chunks(inputs, chunksize)):
+            yield from results
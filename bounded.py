@@ -0,0 +1,91 @@
+from typing import NamedTuple
+
+from engine import LOOPING, OUT_OF_STEPS, OUT_OF_TAPE
+
+# Steps run between budget checks and loop-detector samples
+CHECK_EVERY = 4096
+
+
+class BoundedResult(NamedTuple):
+    status: str
+    state: str
+    accepted: bool
+    steps: int
+    head: int
+    tape: object
+    cells: int  # tape span used, non-blank cells plus the head
+    checks: int  # loop-detector samples taken
+    period: int  # steps between two equal configurations when looping, else 0
+
+
+def _span(tape):
+    """Canonical [start, end) window of a configuration: non-blank cells and the head."""
+    start, end = tape.bounds()
+    pos = tape.position
+    if start == end:
+        return pos, pos + 1
+    return min(start, pos), max(end, pos + 1)
+
+
+def run_bounded(runner, tape="", max_steps=None, max_cells=None, detect_loops=True,
+                check_every=CHECK_EVERY) -> BoundedResult:
+    """Run with step/tape budgets and an optional Brent-style cycle detector.
+
+    `runner` is a Program or a MacroRunner. The run advances in slices of
+    `check_every` steps. Budgets are checked between slices, so the tape
+    span may overshoot `max_cells` by one slice's worth before it is noticed.
+
+    With `detect_loops`, each slice boundary samples the configuration as
+    (state, head offset, window bytes), the window being the non-blank
+    part of the tape plus the head. The sampled sequence runs through
+    Brent's algorithm: a saved snapshot is compared against every later
+    sample and replaced after 1, 2, 4, ... samples. Two equal samples
+    prove the machine repeats forever (possibly shifted along the tape),
+    so the run stops as LOOPING. A cycle of period p is found within
+    O(p) samples, each costing one memcmp against the snapshot.
+    """
+    if max_steps is not None and max_steps < 0:
+        raise ValueError(f"max_steps must be >= 0, got {max_steps}")
+    program = getattr(runner, "program", runner)
+    if isinstance(tape, str):
+        tape = program.load(tape)
+    state = None
+    steps = 0
+    checks = 0
+    period = 0
+    saved = None
+    saved_step = 0
+    power = lam = 1
+
+    while True:
+        n = check_every if max_steps is None else min(check_every, max_steps - steps)
+        r = runner.run(tape, n, state)
+        steps += r.steps
+        state = r.state
+        status = r.status
+        if status != OUT_OF_STEPS:
+            break
+        start, end = _span(tape)
+        if max_cells is not None and end - start > max_cells:
+            status = OUT_OF_TAPE
+            break
+        if max_steps is not None and steps >= max_steps:
+            break
+        if not detect_loops:
+            continue
+
+        checks += 1
+        pos = tape.position - start
+        if saved is not None and saved[0] == state and saved[1] == pos and saved[2] == tape.view(start, end):
+            status = LOOPING
+            period = steps - saved_step
+            break
+        if saved is None or lam == power:
+            saved = (state, pos, bytes(tape.view(start, end)))
+            saved_step = steps
+            power *= 2
+            lam = 0
+        lam += 1
+
+    start, end = _span(tape)
+    return BoundedResult(status, state, r.accepted, steps, r.head, tape, end - start, checks, period)
@@ -0,0 +1,164 @@
+import argparse
+import csv
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+SCHEMA = "schema.json"
+# Rows per chunk file, 64k rows of 10 float64 columns is 5 MB
+CHUNK_ROWS = 1 << 16
+
+
+def _chunk_name(i) -> str:
+    return f"chunk-{i:06d}.npy"
+
+
+def _read_schema(path):
+    with open(os.path.join(path, SCHEMA)) as f:
+        schema = json.load(f)
+    if schema.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported store version {schema.get('version')!r}")
+    return schema
+
+
+class ColumnWriter:
+    """Append rows to a chunked columnar store directory.
+
+    The store is a directory holding `schema.json` (column names, dtype
+    and the row count of every chunk) plus one .npy file per chunk. Each
+    chunk is stored column-major, shape (ncols, rows), so a column is one
+    contiguous run that np.load(mmap_mode="r") can map without copying.
+    Opening an existing store appends new chunks after the old ones.
+    """
+
+    def __init__(self, path, columns, dtype="float64", chunk_rows=CHUNK_ROWS, dedup=False):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, SCHEMA)):
+            self.schema = _read_schema(path)
+            if self.schema["columns"] != list(columns) or self.schema["dtype"] != np.dtype(dtype).str:
+                raise ValueError(f"{path}: columns or dtype differ from the existing store")
+        else:
+            self.schema = {"version": FORMAT_VERSION, "columns": list(columns),
+                           "dtype": np.dtype(dtype).str, "chunks": []}
+            self._write_schema()
+        self.buffer = np.empty((len(columns), chunk_rows), dtype=dtype)
+        self.rows = 0
+        self.dedup = dedup
+        self.last_row = None
+
+    def _write_schema(self):
+        tmp = os.path.join(self.path, SCHEMA + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.schema, f, indent=1)
+        os.replace(tmp, os.path.join(self.path, SCHEMA))
+
+    def append(self, row):
+        if self.dedup:
+            row = tuple(row)
+            if row == self.last_row:
+                return  # Avoid appending duplicate last value
+            self.last_row = row
+        self.buffer[:, self.rows] = row
+        self.rows += 1
+        if self.rows == self.buffer.shape[1]:
+            self.flush()
+
+    def extend(self, rows):
+        """Append a block of rows, shape (n, ncols)."""
+        rows = np.asarray(rows, dtype=self.buffer.dtype)
+        while len(rows):
+            n = min(len(rows), self.buffer.shape[1] - self.rows)
+            self.buffer[:, self.rows:self.rows + n] = rows[:n].T
+            self.rows += n
+            rows = rows[n:]
+            if self.rows == self.buffer.shape[1]:
+                self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        chunks = self.schema["chunks"]
+        name = _chunk_name(len(chunks))
+        np.save(os.path.join(self.path, name), np.ascontiguousarray(self.buffer[:, :self.rows]))
+        chunks.append({"file": name, "rows": self.rows})
+        self._write_schema()
+        self.rows = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnStore:
+    """Read side of a store, every chunk memory-mapped."""
+
+    def __init__(self, path):
+        self.path = path
+        self.schema = _read_schema(path)
+        self.columns = self.schema["columns"]
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.chunks = [np.load(os.path.join(path, c["file"]), mmap_mode="r") for c in self.schema["chunks"]]
+
+    def __len__(self) -> int:
+        return sum(c.shape[1] for c in self.chunks)
+
+    def chunk_columns(self, names=None):
+        """Yield one {name: column view} dict per chunk, without copying."""
+        names = names or self.columns
+        for chunk in self.chunks:
+            yield {name: chunk[self.index[name]] for name in names}
+
+    def column(self, name) -> np.ndarray:
+        """One column across all chunks (a copy when there is more than one chunk)."""
+        parts = [c[self.index[name]] for c in self.chunks]
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=self.schema["dtype"])
+
+    def filter(self, predicate, names=None) -> np.ndarray:
+        """Rows, shape (n, len(names)), where predicate(columns_dict) is True."""
+        names = names or self.columns
+        rows = []
+        for cols in self.chunk_columns():
+            mask = predicate(cols)
+            if mask.any():
+                rows.append(np.array([cols[n][mask] for n in names]).T)
+        if not rows:
+            return np.empty((0, len(names)), dtype=self.schema["dtype"])
+        return np.concatenate(rows)
+
+
+def csv_to_store(csv_path, store_path=None, chunk_rows=CHUNK_ROWS) -> str:
+    """Convert a CSV log with a header row into a columnar store."""
+    if store_path is None:
+        store_path = os.path.splitext(csv_path)[0] + ".cols"
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        with ColumnWriter(store_path, columns, chunk_rows=chunk_rows) as out:
+            batch = []
+            for row in reader:
+                if row:
+                    batch.append(row)
+                if len(batch) == chunk_rows:
+                    out.extend(np.array(batch, dtype=float))
+                    batch = []
+            if batch:
+                out.extend(np.array(batch, dtype=float))
+    return store_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert CSV logs to columnar stores")
+    parser.add_argument("csv", nargs="+")
+    args = parser.parse_args()
+    for path in args.csv:
+        print(csv_to_store(path))
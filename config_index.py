@@ -0,0 +1,194 @@
+import argparse
+import csv
+import os
+
+import numpy as np
+
+from colstore import ColumnStore
+
+# Side of a hash cell, in workspace units (pixels)
+CELL = 10.0
+
+
+def _angle_columns(columns, n_angles):
+    names = [f"Angle{i}" for i in range(n_angles)]
+    missing = [n for n in names + ["XF", "YF"] if n not in columns]
+    if missing:
+        raise ValueError(f"Log is missing columns {missing}")
+    return names
+
+
+class ConfigIndex:
+    """Uniform grid hash from end-effector positions to the joint angles that reached them.
+
+    Points live in growable arrays; `cells` maps an integer cell (cx, cy)
+    to the indices of the points inside it. Inserts are O(1) amortized and
+    nearest() only visits the rings of cells around the query. Angles
+    follow one of kinematics.Chain's conventions, recorded in `cumulative`:
+    relative joint angles (trial.py's arm) or absolute link headings
+    (playground.py's arm, and the target-*.csv logs).
+    """
+
+    def __init__(self, n_angles, cell=CELL, cumulative=False) -> None:
+        self.n_angles = n_angles
+        self.cell = cell
+        self.cumulative = cumulative
+        self.points = np.empty((0, 2))
+        self.angles = np.empty((0, n_angles))
+        self.size = 0
+        self.cells = {}
+        # Cell-space bounding box of the data, (x, y) of the lowest and highest cells
+        self.lo = (0, 0)
+        self.hi = (-1, -1)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def convert(self, cumulative) -> None:
+        """Rewrite the stored angles as cumulative or absolute ones, in place."""
+        if cumulative != self.cumulative:
+            angles = self.angles[:self.size]
+            angles[...] = np.diff(angles, axis=1, prepend=0.0) if cumulative else np.cumsum(angles, axis=1)
+            self.cumulative = cumulative
+
+    def match_chain(self, chain) -> None:
+        """Raise ValueError unless the angle count fits `chain`, then switch to its convention.
+
+        Seeds with the wrong count or convention would be silently wrong starts.
+        """
+        if self.n_angles != chain.n_links:
+            raise ValueError(f"Index holds {self.n_angles} angles, the machine has {chain.n_links} joints")
+        self.convert(chain.cumulative)
+
+    def _key(self, point):
+        return (int(np.floor(point[0] / self.cell)), int(np.floor(point[1] / self.cell)))
+
+    def insert(self, point, angles) -> None:
+        if self.size == len(self.points):
+            capacity = max(1024, 2 * self.size)
+            self.points = np.resize(self.points, (capacity, 2))
+            self.angles = np.resize(self.angles, (capacity, self.n_angles))
+        self.points[self.size] = point
+        self.angles[self.size] = angles[:self.n_angles]
+        key = self._key(point)
+        self.cells.setdefault(key, []).append(self.size)
+        if self.size:
+            self.lo = (min(self.lo[0], key[0]), min(self.lo[1], key[1]))
+            self.hi = (max(self.hi[0], key[0]), max(self.hi[1], key[1]))
+        else:
+            self.lo = self.hi = key
+        self.size += 1
+
+    def rebuild(self, points, angles) -> None:
+        """Replace the contents with arrays of shape (n, 2) and (n, n_angles)."""
+        self.points = np.array(points, dtype=float).reshape(-1, 2)
+        self.angles = np.array(angles, dtype=float).reshape(-1, self.n_angles)
+        self.size = len(self.points)
+        keys = np.floor(self.points / self.cell).astype(np.int64)
+        order = np.lexsort((keys[:, 1], keys[:, 0]))
+        sorted_keys = keys[order]
+        if self.size:
+            self.lo = tuple(int(v) for v in keys.min(axis=0))
+            self.hi = tuple(int(v) for v in keys.max(axis=0))
+        else:
+            self.lo, self.hi = (0, 0), (-1, -1)
+        starts = np.flatnonzero(np.any(np.diff(sorted_keys, axis=0), axis=1)) + 1
+        self.cells = {
+            (int(k[0]), int(k[1])): idx.tolist()
+            for k, idx in zip(sorted_keys[np.r_[0, starts]] if self.size else [], np.split(order, starts))
+        }
+
+    def _ring(self, cx, cy, r):
+        """Indices of the points in the cells exactly r cells from (cx, cy), clipped to the data."""
+        (x0, y0), (x1, y1) = self.lo, self.hi
+        found = []
+        cells = self.cells
+        xs = range(max(cx - r, x0), min(cx + r, x1) + 1)
+        for y in (cy - r, cy + r) if r else (cy,):
+            if y0 <= y <= y1:
+                for x in xs:
+                    found.extend(cells.get((x, y), ()))
+        ys = range(max(cy - r + 1, y0), min(cy + r - 1, y1) + 1)
+        for x in (cx - r, cx + r) if r else ():
+            if x0 <= x <= x1:
+                for y in ys:
+                    found.extend(cells.get((x, y), ()))
+        return found
+
+    def nearest(self, point, k=1):
+        """The k closest logged configurations as (points, angles, distances), nearest first."""
+        if not self.size:
+            return np.empty((0, 2)), np.empty((0, self.n_angles)), np.empty(0)
+        point = np.asarray(point, dtype=float)
+        cx, cy = self._key(point)
+        (x0, y0), (x1, y1) = self.lo, self.hi
+        # No cell holding data is nearer than `first` rings or further than `last`
+        first = max(x0 - cx, cx - x1, y0 - cy, cy - y1, 0)
+        last = max(cx - x0, x1 - cx, cy - y0, y1 - cy)
+        idx = np.empty(0, dtype=int)
+        d = np.empty(0)
+        for r in range(first, last + 1):
+            found = self._ring(cx, cy, r)
+            if found:
+                idx = np.concatenate((idx, found))
+                d = np.concatenate((d, np.linalg.norm(self.points[found] - point, axis=1)))
+            # Anything outside ring r is at least r cells away
+            if len(d) >= k and np.partition(d, k - 1)[k - 1] <= r * self.cell:
+                break
+        best = np.argsort(d)[:k]
+        return self.points[idx[best]], self.angles[idx[best]], d[best]
+
+    def save(self, path) -> None:
+        np.savez(path, cell=self.cell, cumulative=self.cumulative,
+                 points=self.points[:self.size], angles=self.angles[:self.size])
+
+    @classmethod
+    def load(cls, path) -> "ConfigIndex":
+        with np.load(path) as f:
+            if "cumulative" not in f:
+                raise ValueError(f"{path} does not record its angle convention, rebuild it")
+            index = cls(f["angles"].shape[1], float(f["cell"]), bool(f["cumulative"]))
+            index.rebuild(f["points"], f["angles"])
+        return index
+
+    @classmethod
+    def from_logs(cls, paths, n_angles=2, cell=CELL, cumulative=False) -> "ConfigIndex":
+        """Bulk build from target-*.csv logs and/or .cols stores (angles stay in degrees).
+
+        `cumulative` is the convention the logged angles are in. The defaults
+        match the target-*.csv logs: two absolute headings of a 2-link arm,
+        XF/YF being their end effector.
+        """
+        points, angles = [], []
+        for path in paths:
+            if os.path.isdir(path):
+                store = ColumnStore(path)
+                names = _angle_columns(store.columns, n_angles)
+                points.append(np.stack([store.column("XF"), store.column("YF")], axis=-1))
+                angles.append(np.stack([store.column(n) for n in names], axis=-1))
+                continue
+            with open(path, newline="") as f:
+                columns = next(csv.reader(f))
+            names = _angle_columns(columns, n_angles)
+            usecols = [columns.index(n) for n in ["XF", "YF"] + names]
+            data = np.loadtxt(path, delimiter=",", skiprows=1, usecols=usecols, ndmin=2)
+            points.append(data[:, :2])
+            angles.append(data[:, 2:])
+        index = cls(n_angles, cell, cumulative)
+        if points:
+            index.rebuild(np.concatenate(points), np.concatenate(angles))
+        return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index logged arm configurations by end-effector position")
+    parser.add_argument("logs", nargs="+", help="target-*.csv logs or .cols stores")
+    parser.add_argument("--angles", type=int, default=2, help="joint angles per configuration")
+    parser.add_argument("--cumulative", action="store_true", help="logged angles are relative joint angles")
+    parser.add_argument("--cell", type=float, default=CELL)
+    parser.add_argument("--out", default="config-index.npz")
+    args = parser.parse_args()
+
+    index = ConfigIndex.from_logs(args.logs, args.angles, args.cell, args.cumulative)
+    index.save(args.out)
+    print(f"{args.out}: {len(index)} configurations in {len(index.cells)} cells")
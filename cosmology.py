@@ -0,0 +1,132 @@
+from functools import lru_cache
+
+import numpy as np
+
+# pantheon_try.py's values
+H0 = 70  # Hubble constant in km/s/Mpc
+C = 3e5  # Speed of light in km/s
+OMEGA_M = 0.3  # Matter density parameter
+
+# Redshift spacing of the integral tables. Nodes come from Simpson's rule and
+# values between them from cubic Hermite interpolation (the slope is 1/E),
+# which keeps distances within 1e-7 (relative) of quad down to z=0
+Z_STEP = 0.01
+# Tables cover [0, Z_MAX] and double until they reach the largest z asked for
+Z_MAX = 2.5
+
+
+def _flat(Omega_m, Omega_L):
+    # Omega_L=None means a flat universe, as pantheon_try.py's 0.3 / 0.7
+    return 1.0 - np.asarray(Omega_m) if Omega_L is None else Omega_L
+
+
+def _redshifts(z) -> np.ndarray:
+    """z as a float array, checked before it sizes or indexes any table.
+
+    Tables start at z=0, so negative redshifts (and NaN or inf, which have
+    no node) are rejected rather than read off the wrong end.
+    """
+    z = np.asarray(z, dtype=float)
+    bad = ~(np.isfinite(z) & (z >= 0))
+    if bad.any():
+        raise ValueError(f"Redshifts must be finite and >= 0, got {z[bad].flat[0]}")
+    return z
+
+
+def _z_max(z) -> float:
+    z_max = Z_MAX
+    top = float(np.max(z, initial=0.0))
+    while z_max < top:
+        z_max *= 2
+    return z_max
+
+
+def z_grid(z_max=Z_MAX) -> np.ndarray:
+    return np.linspace(0.0, z_max, int(round(z_max / Z_STEP)) + 1)
+
+
+def integral_tables(Omega_m, Omega_L=None, z_max=Z_MAX):
+    """Integral of 1/E(z) from 0 to every z_grid(z_max) node, and 1/E at the nodes.
+
+    Omega_m and Omega_L broadcast together; both results have their shape
+    plus the grid axis. E(z) is pantheon_try.py's, curvature included.
+    """
+    Omega_L = np.asarray(_flat(Omega_m, Omega_L), dtype=float)[..., None]
+    Omega_m = np.asarray(Omega_m, dtype=float)[..., None]
+    Omega_k = 1.0 - Omega_m - Omega_L
+    # Nodes and the midpoints between them
+    zp1 = 1.0 + np.linspace(0.0, z_max, 2 * int(round(z_max / Z_STEP)) + 1)
+    inv_e = 1.0 / np.sqrt(Omega_m * zp1**3 + Omega_k * zp1**2 + Omega_L)
+    nodes = inv_e[..., ::2]
+    table = np.zeros(nodes.shape)
+    simpson = (nodes[..., :-1] + 4 * inv_e[..., 1::2] + nodes[..., 1:]) * (Z_STEP / 6)
+    np.cumsum(simpson, axis=-1, out=table[..., 1:])
+    return table, nodes
+
+
+@lru_cache(maxsize=256)
+def _tables(Omega_m, Omega_L, z_max):
+    table, slope = integral_tables(Omega_m, Omega_L, z_max)
+    table.flags.writeable = slope.flags.writeable = False
+    return table, slope
+
+
+def _hermite(z, z_max):
+    """Node index below each z (from _redshifts) and the four cubic Hermite weights."""
+    position = z / Z_STEP
+    index = np.minimum(position.astype(np.intp), int(round(z_max / Z_STEP)) - 1)
+    t = position - index
+    t2 = t * t
+    t3 = t2 * t
+    return index, (2 * t3 - 3 * t2 + 1, (t3 - 2 * t2 + t) * Z_STEP, 3 * t2 - 2 * t3, (t3 - t2) * Z_STEP)
+
+
+def _interpolate(table, slope, index, weights):
+    w0, w1, w2, w3 = weights
+    return (table[..., index] * w0 + slope[..., index] * w1
+            + table[..., index + 1] * w2 + slope[..., index + 1] * w3)
+
+
+def comoving_integral(z, Omega_m=OMEGA_M, Omega_L=None) -> np.ndarray:
+    """Integral of 1/E from 0 to each z, read from tables cached per (Omega_m, Omega_L).
+
+    H0 only scales distances, so one table serves every H0.
+    """
+    z = _redshifts(z)
+    z_max = _z_max(z)
+    table, slope = _tables(float(Omega_m), float(_flat(Omega_m, Omega_L)), z_max)
+    return _interpolate(table, slope, *_hermite(z, z_max))
+
+
+def luminosity_distance_lcdm(z, H0=H0, Omega_m=OMEGA_M, Omega_L=None) -> np.ndarray:
+    """ΛCDM luminosity distance in Mpc, (c/H0) * (1+z) * integral, for any array of z >= 0."""
+    z = _redshifts(z)
+    return (C / H0) * (1 + z) * comoving_integral(z, Omega_m, Omega_L)
+
+
+def luminosity_distance_drag(z, alpha, H0=H0):
+    """Photon drag model, d_L = (c/H0) * (1+z) * exp(-alpha * ln(1+z))."""
+    return (C / H0) * (1 + z) * np.exp(-alpha * np.log(1 + z))
+
+
+class FixedRedshifts:
+    """Interpolation weights for one redshift sample, reused across parameter sets.
+
+    integrals() evaluates whole arrays of (Omega_m, Omega_L) against the
+    sample at once: one table row per parameter set, then a gather and a
+    blend with the precomputed weights.
+    """
+
+    def __init__(self, z) -> None:
+        self.z = _redshifts(z)
+        self.z_max = _z_max(self.z)
+        self.index, self.weights = _hermite(self.z, self.z_max)
+
+    def integrals(self, Omega_m, Omega_L=None) -> np.ndarray:
+        """Shape of the broadcast parameters plus one axis for the sample."""
+        table, slope = integral_tables(Omega_m, Omega_L, self.z_max)
+        return _interpolate(table, slope, self.index, self.weights)
+
+    def luminosity_distance_lcdm(self, H0=H0, Omega_m=OMEGA_M, Omega_L=None) -> np.ndarray:
+        H0 = np.asarray(H0, dtype=float)[..., None]
+        return (C / H0) * (1 + self.z) * self.integrals(Omega_m, Omega_L)
@@ -0,0 +1,162 @@
+from array import array
+from typing import NamedTuple
+
+from tape import Tape
+
+BLANK = "_"
+# Symbol that input characters outside the alphabet are read as. No rule
+# reads it, so the machine halts there; the parens keep it out of .mach words
+UNKNOWN = "(?)"
+
+# Direction tokens accepted in .mach transitions
+MOVES = {">": 1, "R": 1, "<": -1, "L": -1, "-": 0, "S": 0, "N": 0}
+
+# Run outcomes
+HALTED = "halted"
+OUT_OF_STEPS = "max_steps"
+LOOPING = "looping"
+OUT_OF_TAPE = "max_cells"
+
+
+class RunResult(NamedTuple):
+    status: str
+    state: str
+    accepted: bool
+    steps: int
+    head: int
+    tape: Tape
+
+
+def pack_entry(next_base, write, move):
+    """Pack one transition into a single int, 0 is reserved for "no transition"."""
+    return (next_base << 16) | (write << 8) | (move + 2)
+
+
+class Program:
+    """A machine compiled to a dense table indexed by state_id * nsym + symbol_id.
+
+    Every entry holds the next state's row offset, the symbol to write and
+    the head move packed into one int, so a step is a single table lookup.
+    """
+
+    def __init__(self, states, symbols, init, finals, table) -> None:
+        self.states = list(states)
+        self.symbols = list(symbols)
+        self.state_ids = {s: i for i, s in enumerate(self.states)}
+        self.symbol_ids = {s: i for i, s in enumerate(self.symbols)}
+        self.nsym = len(self.symbols)
+        self.unknown = self.symbol_ids.get(UNKNOWN)
+        self.init = init
+        self.finals = frozenset(finals)
+        self.table = table
+
+    def __reduce__(self):
+        # A table mapped from the cache is a memoryview, ship a copy instead
+        return (Program, (self.states, self.symbols, self.init, self.finals, array("q", self.table)))
+
+    def encode(self, text) -> list:
+        """Symbol ids of `text`, characters outside the alphabet become UNKNOWN."""
+        if self.unknown is not None:
+            ids, unknown = self.symbol_ids, self.unknown
+            return [ids.get(ch, unknown) for ch in text]
+        try:
+            return [self.symbol_ids[ch] for ch in text]
+        except KeyError as e:
+            raise ValueError(f"Symbol {e.args[0]!r} is not in the machine alphabet") from None
+
+    def decode(self, cells) -> str:
+        symbols = self.symbols
+        return "".join(symbols[c] for c in cells)
+
+    def load(self, text="") -> Tape:
+        """Build a tape holding `text` with the head on its first symbol."""
+        return Tape(self.encode(text))
+
+    def tape_string(self, tape) -> str:
+        return self.decode(tape.trimmed())
+
+    def run(self, tape="", max_steps=None, state=None) -> RunResult:
+        """Run the machine on a Tape (or a string loaded onto a fresh one).
+
+        `state` resumes from a named state instead of the initial one. If
+        the tape has to grow while a view of it is held, BufferError is
+        raised with the tape as it was before the step that needed the room.
+        """
+        if max_steps is not None and max_steps < 0:
+            raise ValueError(f"max_steps must be >= 0, got {max_steps}")
+        if isinstance(tape, str):
+            tape = self.load(tape)
+        table = self.table
+        nsym = self.nsym
+        cells = tape.cells
+        end = len(cells)
+        head = tape.head
+        base = (self.init if state is None else self.state_ids[state]) * nsym
+        limit = -1 if max_steps is None else max_steps
+        steps = 0
+        status = OUT_OF_STEPS
+
+        while steps != limit:
+            e = table[base + cells[head]]
+            if not e:
+                status = HALTED
+                break
+            move = (e & 0xFF) - 2
+            if not 0 <= head + move < end:
+                # Grow before the step, a tape that cannot grow is left as it was
+                tape.head = head
+                if head + move < 0:
+                    head += tape.grow_left()
+                    end = len(cells)
+                else:
+                    end += tape.grow_right()
+            cells[head] = (e >> 8) & 0xFF
+            head += move
+            base = e >> 16
+            steps += 1
+
+        tape.head = head
+        state = base // nsym
+        return RunResult(status, self.states[state], state in self.finals, steps, tape.position, tape)
+
+
+def compile_program(init, finals, transitions, blank=BLANK) -> Program:
+    """Intern states/symbols and build the packed transition table."""
+    if isinstance(finals, str):
+        finals = [finals]
+    states = {init: 0}
+    symbols = {blank: 0}
+    rows = []
+    for t in transitions:
+        if len(t) != 5:
+            raise ValueError(f"Transition {t!r} must have 5 fields")
+        state, symbol, new_state, write, direction = t
+        if direction not in MOVES:
+            raise ValueError(f"Unknown direction {direction!r} in transition {t!r}")
+        for s in (state, new_state):
+            states.setdefault(s, len(states))
+        for s in (symbol, write):
+            symbols.setdefault(s, len(symbols))
+        rows.append((states[state], symbols[symbol], states[new_state], symbols[write], MOVES[direction]))
+    for s in finals:
+        states.setdefault(s, len(states))
+    # An empty column, so unknown input halts the machine instead of failing to load
+    symbols.setdefault(UNKNOWN, len(symbols))
+
+    nsym = len(symbols)
+    if nsym > 256:
+        raise ValueError(f"Alphabet has {nsym} symbols, at most 256 are supported")
+    final_ids = {states[s] for s in finals}
+    table = array("q", bytes(8 * len(states) * nsym))
+    for state, symbol, new_state, write, move in rows:
+        # Final states halt, so their rows stay empty
+        if state in final_ids:
+            continue
+        idx = state * nsym + symbol
+        entry = pack_entry(new_state * nsym, write, move)
+        if table[idx] and table[idx] != entry:
+            raise ValueError(
+                f"Conflicting transitions for ({list(states)[state]}, {list(symbols)[symbol]})"
+            )
+        table[idx] = entry
+    return Program(states, symbols, 0, final_ids, table)
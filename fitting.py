@@ -0,0 +1,281 @@
+import argparse
+import os
+from contextlib import nullcontext
+from multiprocessing import Pool
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from colstore import SCHEMA, ColumnStore, ColumnWriter
+from cosmology import C, FixedRedshifts
+
+PANTHEON = "lcparam_full_long.txt"
+
+# Parameters of each model. The first one changes the shape of the Hubble
+# diagram; M_ref and H0 only shift it by M_ref + 25 + 5 log10(c / H0)
+PARAMS = {
+    "drag": ("alpha", "M_ref", "H0"),
+    "lcdm": ("Omega_m", "M_ref", "H0"),
+}
+# Uniform prior bounds, also the default grid ranges
+BOUNDS = {"alpha": (-2.0, 2.0), "Omega_m": (0.0, 1.0), "M_ref": (-20.5, -18.0), "H0": (50.0, 90.0)}
+START = {"alpha": 0.1, "Omega_m": 0.3, "M_ref": -19.3, "H0": 70.0}
+
+# Parameter sets per chi² evaluation, 4096 sets of 1048 supernovae are 34 MB
+BLOCK = 1 << 12
+# Stretch move scale, emcee's default
+STRETCH = 2.0
+# Steps per chain chunk written to disk, so a crash loses at most this many
+FLUSH_STEPS = 16
+
+
+class Pantheon(NamedTuple):
+    z: np.ndarray
+    mb: np.ndarray
+    dmb: np.ndarray
+
+
+def load_pantheon(path=PANTHEON) -> Pantheon:
+    """CMB-frame redshifts, apparent magnitudes and their errors from an lcparam file."""
+    df = pd.read_csv(path, sep=r"\s+", comment="#")
+    return Pantheon(df["zcmb"].to_numpy(float), df["mb"].to_numpy(float), df["dmb"].to_numpy(float))
+
+
+class Likelihood:
+    """Diagonal chi² of the Pantheon+ magnitudes, mb = M_ref + 5 log10(d_L / Mpc) + 25.
+
+    chi2() takes parameter sets as rows, (shape parameter, M_ref, H0).
+    The model curve is built once per distinct shape parameter in a block,
+    and the offset enters through weighted sums, so a grid costs about one
+    curve per alpha / Omega_m value however many M_ref and H0 it holds.
+    """
+
+    def __init__(self, data, model="lcdm") -> None:
+        if model not in PARAMS:
+            raise ValueError(f"unknown model {model!r}, expected one of {sorted(PARAMS)}")
+        self.data = data
+        self.model = model
+        self.params = PARAMS[model]
+        self.weight = 1.0 / data.dmb**2
+        self.total_weight = self.weight.sum()
+        self.log_zp1 = np.log10(1 + data.z)
+        self.redshifts = FixedRedshifts(data.z)
+        self.bounds = np.array([BOUNDS[p] for p in self.params])
+
+    def curve(self, shape) -> np.ndarray:
+        """5 log10 of H0 d_L / c for each shape value, shape (len(shape), n_supernovae)."""
+        shape = np.asarray(shape, dtype=float)[:, None]
+        if self.model == "drag":
+            # (1+z) * exp(-alpha * ln(1+z))
+            return 5 * (1 - shape) * self.log_zp1
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return 5 * (np.log10(self.redshifts.integrals(shape[:, 0])) + self.log_zp1)
+
+    def chi2(self, params) -> np.ndarray:
+        params = np.atleast_2d(np.asarray(params, dtype=float))
+        shape, inverse = np.unique(params[:, 0], return_inverse=True)
+        residual = self.data.mb - self.curve(shape)
+        # chi² = sum w (r - offset)², split around the weighted mean of r
+        mean = residual @ self.weight / self.total_weight
+        spread = ((residual - mean[:, None]) ** 2) @ self.weight
+        offset = params[:, 1] + 25 + 5 * np.log10(C / params[:, 2])
+        chi2 = spread[inverse] + self.total_weight * (offset - mean[inverse]) ** 2
+        return np.where(np.isfinite(chi2), chi2, np.inf)
+
+    def log_prob(self, params) -> np.ndarray:
+        """-chi²/2 inside the prior bounds, -inf outside."""
+        params = np.atleast_2d(np.asarray(params, dtype=float))
+        inside = np.all((params >= self.bounds[:, 0]) & (params <= self.bounds[:, 1]), axis=1)
+        out = np.full(len(params), -np.inf)
+        if inside.any():
+            out[inside] = -0.5 * self.chi2(params[inside])
+        return out
+
+
+# Per-worker likelihood, set once by the pool initializer
+_likelihood = None
+
+
+def _init_worker(data, model) -> None:
+    global _likelihood
+    _likelihood = Likelihood(data, model)
+
+
+def _chi2_block(params):
+    return _likelihood.chi2(params)
+
+
+def _log_prob_block(params):
+    return _likelihood.log_prob(params)
+
+
+def _pool(data, model, workers):
+    """Process pool with a Likelihood per worker, or a null context (None) for one worker."""
+    if workers == 1:
+        _init_worker(data, model)
+        return nullcontext()
+    return Pool(workers, _init_worker, (data, model))
+
+
+def _map(pool, fn, blocks):
+    return [fn(b) for b in blocks] if pool is None else pool.map(fn, blocks)
+
+
+class GridScan(NamedTuple):
+    axes: dict
+    chi2: np.ndarray
+    best: dict
+    best_chi2: float
+
+
+def scan(data, model, axes, block=BLOCK, workers=None) -> GridScan:
+    """chi² on the full grid of `axes` ({name: 1-D values}), in blocks across a process pool.
+
+    The result array has one dimension per parameter, in PARAMS[model] order.
+    """
+    names = PARAMS[model]
+    values = [np.asarray(axes[n], dtype=float) for n in names]
+    # The shape parameter varies slowest, so each block holds few distinct curves
+    grid = np.stack(np.meshgrid(*values, indexing="ij"), axis=-1).reshape(-1, len(names))
+    blocks = [grid[i:i + block] for i in range(0, len(grid), block)]
+    with _pool(data, model, workers or os.cpu_count() or 1) as pool:
+        chi2 = np.concatenate(_map(pool, _chi2_block, blocks))
+    chi2 = chi2.reshape([len(v) for v in values])
+    i = np.unravel_index(np.argmin(chi2), chi2.shape)
+    best = {n: float(v[j]) for n, v, j in zip(names, values, i)}
+    return GridScan(dict(zip(names, values)), chi2, best, float(chi2[i]))
+
+
+class Ensemble(NamedTuple):
+    position: np.ndarray
+    log_prob: np.ndarray
+    acceptance: float
+    best: dict
+    best_log_prob: float
+
+
+def _stored_walkers(store, walkers):
+    """(last step, positions of that step) of an existing chain store."""
+    step = store.column("step")
+    last = step.max()
+    rows = store.filter(lambda cols: cols["step"] == last)
+    if len(rows) != walkers:
+        raise ValueError(f"{store.path} holds {len(rows)} walkers, not {walkers}")
+    rows = rows[np.argsort(rows[:, 1])]
+    return int(last), rows[:, 2:-1]
+
+
+def sample(data, model, steps, walkers=32, start=None, scatter=1e-3, seed=None, workers=None,
+           out=None, append=False) -> Ensemble:
+    """Affine-invariant ensemble MCMC (Goodman & Weare stretch move) on the model posterior.
+
+    Each step updates the two halves of the ensemble in turn against the
+    other half; a half's proposals are evaluated as blocks across the
+    process pool. With `out`, every step's walkers are appended to a
+    colstore directory with columns step, walker, the parameters and
+    log_prob, FLUSH_STEPS steps per chunk, so long chains never sit in
+    memory and the store trails the sampler by at most that much. A
+    store that already holds a chain is refused unless `append`, which
+    continues that chain from its last step instead of starting from
+    `start`.
+    """
+    names = PARAMS[model]
+    ndim = len(names)
+    if walkers < 2 * ndim or walkers % 2:
+        raise ValueError(f"walkers must be even and at least {2 * ndim}")
+    rng = np.random.default_rng(seed)
+    first_step = 0
+    if out and os.path.exists(os.path.join(out, SCHEMA)) and len(ColumnStore(out)):
+        if not append:
+            raise FileExistsError(f"{out} already holds a chain, "
+                                  "append to it (append=True, --append) or use another path")
+        last, position = _stored_walkers(ColumnStore(out), walkers)
+        first_step = last + 1
+    else:
+        start = np.array([(start or {}).get(n, START[n]) for n in names])
+        position = start + scatter * np.maximum(np.abs(start), 1.0) * rng.standard_normal((walkers, ndim))
+    workers = workers or os.cpu_count() or 1
+
+    walker_ids = np.arange(walkers)
+    halves = (walker_ids[:walkers // 2], walker_ids[walkers // 2:])
+    accepted = 0
+    with _pool(data, model, workers) as pool:
+
+        def evaluate(params):
+            return np.concatenate(_map(pool, _log_prob_block, np.array_split(params, workers)))
+
+        columns = ("step", "walker") + names + ("log_prob",)
+        writer = ColumnWriter(out, columns, chunk_rows=walkers * FLUSH_STEPS) if out else nullcontext()
+        with writer:
+            log_prob = evaluate(position)
+            best = np.argmax(log_prob)
+            best_position, best_log_prob = position[best].copy(), log_prob[best]
+            for step in range(first_step, first_step + steps):
+                for active, other in (halves, halves[::-1]):
+                    z = ((STRETCH - 1) * rng.random(len(active)) + 1) ** 2 / STRETCH
+                    partner = position[rng.choice(other, len(active))]
+                    proposal = partner + z[:, None] * (position[active] - partner)
+                    proposal_log_prob = evaluate(proposal)
+                    accept = (np.log(rng.random(len(active)))
+                              < (ndim - 1) * np.log(z) + proposal_log_prob - log_prob[active])
+                    position[active[accept]] = proposal[accept]
+                    log_prob[active[accept]] = proposal_log_prob[accept]
+                    accepted += int(accept.sum())
+                best = np.argmax(log_prob)
+                if log_prob[best] > best_log_prob:
+                    best_position, best_log_prob = position[best].copy(), log_prob[best]
+                if out:
+                    writer.extend(np.column_stack((np.full(walkers, step), walker_ids, position, log_prob)))
+    return Ensemble(position, log_prob, accepted / max(steps * walkers, 1),
+                    dict(zip(names, best_position.tolist())), float(best_log_prob))
+
+
+def chain_summary(path, burn=0) -> dict:
+    """{parameter: (median, 16th, 84th percentile)} of a chain store, skipping `burn` steps."""
+    store = ColumnStore(path)
+    keep = store.column("step") >= burn
+    return {name: tuple(np.percentile(store.column(name)[keep], (50, 16, 84)))
+            for name in store.columns if name not in ("step", "walker", "log_prob")}
+
+
+def _axis(text):
+    name, spec = text.split("=")
+    lo, hi, n = spec.split(":")
+    return name, np.linspace(float(lo), float(hi), int(n))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grid and MCMC fits of the photon drag and ΛCDM models to Pantheon+")
+    parser.add_argument("command", choices=("grid", "mcmc"))
+    parser.add_argument("--model", choices=sorted(PARAMS), default="drag")
+    parser.add_argument("--data", default=PANTHEON)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--axis", type=_axis, action="append", default=[],
+                        help="grid axis name=start:stop:count, default covers BOUNDS with 41 points")
+    parser.add_argument("--out", help="grid: .npz with axes and chi2; mcmc: chain store directory")
+    parser.add_argument("--append", action="store_true", help="mcmc: continue the chain already in --out")
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--walkers", type=int, default=32)
+    parser.add_argument("--burn", type=int, default=500, help="steps dropped from the printed summary")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    data = load_pantheon(args.data)
+    if args.command == "grid":
+        axes = {n: np.linspace(*BOUNDS[n], 41) for n in PARAMS[args.model]}
+        axes.update(args.axis)
+        result = scan(data, args.model, axes, workers=args.workers)
+        print(f"best chi2 {result.best_chi2:.2f} for {len(data.z)} supernovae at {result.best}")
+        if args.out:
+            np.savez(args.out, chi2=result.chi2, **result.axes)
+    else:
+        out = args.out or f"{args.model}-chain.cols"
+        try:
+            result = sample(data, args.model, args.steps, args.walkers, seed=args.seed, workers=args.workers,
+                            out=out, append=args.append)
+        except (FileExistsError, ValueError) as e:
+            parser.error(str(e))
+        print(f"acceptance {result.acceptance:.2f}, best chi2 {-2 * result.best_log_prob:.2f} at {result.best}")
+        for name, (median, lo, hi) in chain_summary(out, args.burn).items():
+            print(f"{name:>8} = {median:.4f} +{hi - median:.4f} -{median - lo:.4f}")
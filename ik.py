@@ -0,0 +1,151 @@
+from typing import NamedTuple
+
+import numpy as np
+
+# Distance to the target, in the chain's units, counted as solved
+TOLERANCE = 1e-3
+MAX_ITERATIONS = 100
+
+
+class IKResult(NamedTuple):
+    angles: np.ndarray  # joint angles in radians, in the chain's own convention
+    error: float  # end-effector distance to the target
+    iterations: int
+    converged: bool
+
+
+def _wrap(angles) -> np.ndarray:
+    return (np.asarray(angles) + np.pi) % (2 * np.pi) - np.pi
+
+
+def _to_relative(chain, angles) -> np.ndarray:
+    angles = np.asarray(angles, dtype=float)[..., :chain.n_links]
+    return angles.copy() if chain.cumulative else np.diff(angles, prepend=0.0)
+
+
+def _from_relative(chain, rel) -> np.ndarray:
+    return rel if chain.cumulative else np.cumsum(rel, axis=-1)
+
+
+def _initial(chain, initial, target) -> np.ndarray:
+    target = np.asarray(target, dtype=float)
+    if initial is None:
+        # A bent arm (a straight one is singular and never leaves its own
+        # line) turned to face the target, away from the pointing-backwards minimum
+        bent = np.full(chain.n_links, 0.5)
+        end = chain.end_effector(_from_relative(chain, bent)) - chain.base
+        to_target = target - chain.base
+        rel = np.broadcast_to(bent, target.shape[:-1] + bent.shape).copy()
+        rel[..., 0] += np.arctan2(to_target[..., 1], to_target[..., 0]) - np.arctan2(end[1], end[0])
+        return _from_relative(chain, rel)
+    initial = np.asarray(initial, dtype=float)[..., :chain.n_links]
+    return np.broadcast_to(initial, target.shape[:-1] + initial.shape[-1:]).copy()
+
+
+def _result(chain, target, angles, iterations, tol) -> IKResult:
+    error = float(np.linalg.norm(chain.end_effector(angles) - target))
+    return IKResult(_wrap(angles), error, iterations, error <= tol)
+
+
+def solve_analytic(chain, target, initial=None, elbow=1, tol=TOLERANCE) -> IKResult:
+    """Closed-form solution for a 2-link chain, `elbow` picks the bend side.
+
+    Out-of-reach targets give the configuration pointing straight at them.
+    """
+    if chain.n_links != 2:
+        raise ValueError(f"The analytic solver needs a 2-link chain, got {chain.n_links}")
+    l1, l2 = chain.lengths
+    dx, dy = np.asarray(target, dtype=float) - chain.base
+    c2 = np.clip((dx * dx + dy * dy - l1 * l1 - l2 * l2) / (2 * l1 * l2), -1.0, 1.0)
+    q2 = elbow * np.arccos(c2)
+    q1 = np.arctan2(dy, dx) - np.arctan2(l2 * np.sin(q2), l1 + l2 * np.cos(q2))
+    return _result(chain, target, _from_relative(chain, np.array([q1, q2])), 1, tol)
+
+
+def jacobian(chain, angles) -> np.ndarray:
+    """d(end effector)/d(angles), shape (..., 2, J)."""
+    h = chain.headings(angles)
+    # Each link's own contribution, as a function of its heading
+    jh = chain.lengths * np.stack((-np.sin(h), np.cos(h)), axis=-2)
+    if not chain.cumulative:
+        return jh
+    # A relative joint turns every link after it as well
+    return np.cumsum(jh[..., ::-1], axis=-1)[..., ::-1]
+
+
+def solve_dls(chain, target, initial=None, damping=1.0, tol=TOLERANCE,
+              max_iterations=MAX_ITERATIONS) -> IKResult:
+    """Damped least-squares (Levenberg-Marquardt style) Jacobian iteration."""
+    target = np.asarray(target, dtype=float)
+    q = _initial(chain, initial, target)
+    lam2 = damping * damping
+    for i in range(max_iterations):
+        e = target - chain.end_effector(q)
+        if e @ e <= tol * tol:
+            return _result(chain, target, q, i, tol)
+        j = jacobian(chain, q)
+        q += j.T @ np.linalg.solve(j @ j.T + lam2 * np.eye(2), e)
+    return _result(chain, target, q, max_iterations, tol)
+
+
+def solve_dls_batch(chain, targets, initial=None, damping=1.0, tol=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS) -> IKResult:
+    """solve_dls over a (B, 2) array of targets at once.
+
+    The result holds arrays: angles (B, J), error, iterations and
+    converged (B,). Converged targets drop out of later iterations.
+    """
+    targets = np.asarray(targets, dtype=float).reshape(-1, 2)
+    q = _initial(chain, initial, targets)
+    iterations = np.zeros(len(targets), dtype=int)
+    active = np.arange(len(targets))
+    eye = damping * damping * np.eye(2)
+    for _ in range(max_iterations):
+        e = targets[active] - chain.end_effector(q[active])
+        moving = np.einsum("ij,ij->i", e, e) > tol * tol
+        active, e = active[moving], e[moving]
+        if not len(active):
+            break
+        j = jacobian(chain, q[active])
+        jt = np.swapaxes(j, -1, -2)
+        q[active] += (jt @ np.linalg.solve(j @ jt + eye, e[..., None]))[..., 0]
+        iterations[active] += 1
+    error = np.linalg.norm(chain.end_effector(q) - targets, axis=-1)
+    return IKResult(_wrap(q), error, iterations, error <= tol)
+
+
+def solve_ccd(chain, target, initial=None, tol=TOLERANCE, max_iterations=MAX_ITERATIONS) -> IKResult:
+    """Cyclic coordinate descent, one sweep from the last joint to the first per iteration."""
+    target = np.asarray(target, dtype=float)
+    rel = _to_relative(chain, _initial(chain, initial, target))
+    for i in range(max_iterations):
+        points = chain.positions(_from_relative(chain, rel))
+        if np.linalg.norm(points[-1] - target) <= tol:
+            return _result(chain, target, _from_relative(chain, rel), i, tol)
+        for j in range(chain.n_links - 1, -1, -1):
+            pivot = points[j]
+            to_end = points[-1] - pivot
+            to_target = target - pivot
+            turn = np.arctan2(to_target[1], to_target[0]) - np.arctan2(to_end[1], to_end[0])
+            rel[j] += turn
+            # Rotate everything past the pivot instead of recomputing the chain
+            c, s = np.cos(turn), np.sin(turn)
+            d = points[j + 1:] - pivot
+            points[j + 1:] = pivot + d @ np.array([[c, s], [-s, c]])
+    return _result(chain, target, _from_relative(chain, rel), max_iterations, tol)
+
+
+SOLVERS = {
+    "analytic": solve_analytic,
+    "dls": solve_dls,
+    "ccd": solve_ccd,
+}
+
+
+def solve(chain, target, method="dls", **kwargs) -> IKResult:
+    """Solve with the named solver from SOLVERS."""
+    try:
+        solver = SOLVERS[method]
+    except KeyError:
+        raise ValueError(f"Unknown IK solver {method!r}, expected one of {sorted(SOLVERS)}") from None
+    return solver(chain, target, **kwargs)
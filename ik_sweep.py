@@ -0,0 +1,156 @@
+import argparse
+import os
+from multiprocessing import Pool
+from typing import NamedTuple
+
+import numpy as np
+
+from ik import TOLERANCE, solve_dls_batch
+from kinematics import Chain, parse_point
+
+# Grid rows solved per pool task
+ROWS_PER_TASK = 8
+
+
+class GridLookup(NamedTuple):
+    angles: np.ndarray
+    error: float
+
+
+def _elbow(chain, angles) -> np.ndarray:
+    """Side the first joint bends to: 1, -1, or 0 for a straight (or 1-link) arm."""
+    if chain.n_links < 2:
+        return np.zeros(np.shape(angles)[:-1])
+    h = chain.headings(angles)
+    return np.sign(np.sin(h[..., 1] - h[..., 0]))
+
+
+def _mirror(chain, angles, targets) -> np.ndarray:
+    """Reflect arms across the line from the base to their targets.
+
+    The end effector keeps its distance to the target, the elbow swaps side.
+    """
+    to_target = np.asarray(targets, dtype=float) - chain.base
+    line = np.arctan2(to_target[..., 1], to_target[..., 0])
+    h = 2 * line[..., None] - chain.headings(angles)
+    angles = np.diff(h, axis=-1, prepend=0.0) if chain.cumulative else h
+    return np.arctan2(np.sin(angles), np.cos(angles))
+
+
+class ReachGrid:
+    """Dense grid of IK solutions over the workspace, answering lookups in O(1).
+
+    Cell (i, j) holds the solved angles and residual error for the target
+    (x0 + j * resolution, y0 + i * resolution). sweep() keeps every cell
+    on the same elbow side so neighbouring solutions can be blended.
+    """
+
+    def __init__(self, chain, x0, y0, resolution, angles, error) -> None:
+        self.chain = chain
+        self.x0 = x0
+        self.y0 = y0
+        self.resolution = resolution
+        self.angles = angles
+        self.error = error
+        # Angles are interpolated as unit vectors so wrap-around blends correctly
+        self._cos = np.cos(angles)
+        self._sin = np.sin(angles)
+        self._elbow = _elbow(chain, angles)
+
+    @property
+    def reachable(self) -> np.ndarray:
+        return self.error <= TOLERANCE
+
+    def lookup(self, x, y) -> GridLookup:
+        """Bilinearly interpolated angles for target (x, y), and their end-effector distance to it.
+
+        Where the four surrounding cells bend the elbow to different sides,
+        blending would land between branches, so the nearest cell is used.
+        """
+        ny, nx = self.error.shape
+        fx = min(max((x - self.x0) / self.resolution, 0.0), nx - 1.0)
+        fy = min(max((y - self.y0) / self.resolution, 0.0), ny - 1.0)
+        j = min(int(fx), max(nx - 2, 0))
+        i = min(int(fy), max(ny - 2, 0))
+        wx, wy = fx - j, fy - i
+        i1, j1 = min(i + 1, ny - 1), min(j + 1, nx - 1)
+        elbows = self._elbow[[i, i, i1, i1], [j, j1, j, j1]]
+        if elbows.min() < 0 < elbows.max():
+            angles = self.angles[int(round(fy)), int(round(fx))]
+        else:
+            weights = ((i, j, (1 - wx) * (1 - wy)), (i, j1, wx * (1 - wy)),
+                       (i1, j, (1 - wx) * wy), (i1, j1, wx * wy))
+            c = sum(w * self._cos[a, b] for a, b, w in weights)
+            s = sum(w * self._sin[a, b] for a, b, w in weights)
+            angles = np.arctan2(s, c)
+        error = np.linalg.norm(self.chain.end_effector(angles) - (x, y))
+        return GridLookup(angles, float(error))
+
+    def save(self, path) -> None:
+        np.savez(
+            path, x0=self.x0, y0=self.y0, resolution=self.resolution,
+            angles=self.angles, error=self.error, base=self.chain.base,
+            lengths=self.chain.lengths, cumulative=self.chain.cumulative,
+        )
+
+    @classmethod
+    def load(cls, path) -> "ReachGrid":
+        with np.load(path) as f:
+            chain = Chain(f["base"], f["lengths"], bool(f["cumulative"]))
+            return cls(chain, float(f["x0"]), float(f["y0"]), float(f["resolution"]),
+                       f["angles"], f["error"])
+
+
+# Per-worker chain and grid columns, set once by the pool initializer
+_chain = None
+_xs = None
+
+
+def _init_worker(chain, xs) -> None:
+    global _chain, _xs
+    _chain, _xs = chain, xs
+
+
+def _solve_rows(ys):
+    gx, gy = np.meshgrid(_xs, ys)
+    targets = np.stack((gx.ravel(), gy.ravel()), axis=-1)
+    r = solve_dls_batch(_chain, targets)
+    # DLS from the generic start lands on either elbow side; mirror onto one
+    angles = r.angles
+    flip = _elbow(_chain, angles) < 0
+    angles[flip] = _mirror(_chain, angles[flip], targets[flip])
+    shape = gx.shape
+    return angles.reshape(shape + (_chain.n_links,)), r.error.reshape(shape)
+
+
+def sweep(chain, width=900, height=600, resolution=10.0, workers=None) -> ReachGrid:
+    """Solve every grid target of a width x height workspace across a process pool."""
+    xs = np.arange(0.0, width, resolution)
+    ys = np.arange(0.0, height, resolution)
+    blocks = [ys[i:i + ROWS_PER_TASK] for i in range(0, len(ys), ROWS_PER_TASK)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(chain, xs)
+        parts = [_solve_rows(b) for b in blocks]
+    else:
+        with Pool(workers, _init_worker, (chain, xs)) as pool:
+            parts = pool.map(_solve_rows, blocks)
+    angles = np.concatenate([p[0] for p in parts])
+    error = np.concatenate([p[1] for p in parts])
+    return ReachGrid(chain, 0.0, 0.0, resolution, angles, error)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill an IK lookup grid for an arm")
+    parser.add_argument("points", nargs="+", type=parse_point, help="joint positions x,y, base first")
+    parser.add_argument("--absolute", action="store_true", help="angles are absolute link headings (playground.py)")
+    parser.add_argument("--size", type=parse_point, default=[900, 600], help="workspace width,height")
+    parser.add_argument("--resolution", type=float, default=10.0)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--out", default="reach-grid.npz")
+    args = parser.parse_args()
+
+    chain = Chain.from_points(args.points, cumulative=not args.absolute)
+    grid = sweep(chain, args.size[0], args.size[1], args.resolution, args.workers)
+    grid.save(args.out)
+    print(f"{args.out}: {grid.error.size} targets, {grid.reachable.mean():.1%} reachable")
@@ -0,0 +1,58 @@
+import numpy as np
+
+
+class Chain:
+    """Planar serial arm with link lengths fixed at construction.
+
+    Angles are in radians. With `cumulative` each joint angle is relative
+    to the previous link (trial.py's arm), otherwise every angle is the
+    absolute heading of its link (playground.py's arm). All methods take a
+    single angle vector of shape (J,) or a batch of shape (B, J).
+    """
+
+    def __init__(self, base, lengths, cumulative=True) -> None:
+        self.base = np.asarray(base, dtype=float)
+        self.lengths = np.asarray(lengths, dtype=float)
+        self.cumulative = cumulative
+
+    @classmethod
+    def from_points(cls, points, cumulative=True) -> "Chain":
+        """Build a chain from its joint positions, base first."""
+        points = np.asarray(points, dtype=float)
+        return cls(points[0], np.linalg.norm(np.diff(points, axis=0), axis=1), cumulative)
+
+    @property
+    def n_links(self) -> int:
+        return len(self.lengths)
+
+    @property
+    def reach(self) -> float:
+        return float(self.lengths.sum())
+
+    def headings(self, angles) -> np.ndarray:
+        """Absolute heading of every link, shape (..., J)."""
+        a = np.asarray(angles, dtype=float)[..., :self.n_links]
+        return np.cumsum(a, axis=-1) if self.cumulative else a
+
+    def positions(self, angles) -> np.ndarray:
+        """All joint positions including the base, shape (..., J + 1, 2)."""
+        h = self.headings(angles)
+        links = self.lengths[:, None] * np.stack((np.cos(h), np.sin(h)), axis=-1)
+        out = np.empty(h.shape[:-1] + (self.n_links + 1, 2))
+        out[..., 0, :] = self.base
+        np.cumsum(links, axis=-2, out=out[..., 1:, :])
+        out[..., 1:, :] += self.base
+        return out
+
+    def end_effector(self, angles) -> np.ndarray:
+        """End-effector position only, shape (..., 2)."""
+        h = self.headings(angles)
+        x = self.base[0] + np.cos(h) @ self.lengths
+        y = self.base[1] + np.sin(h) @ self.lengths
+        return np.stack((x, y), axis=-1)
+
+
+def parse_point(text) -> list:
+    """Command-line "x,y" to a [x, y] point in the chain's units."""
+    x, y = text.split(",")
+    return [float(x), float(y)]
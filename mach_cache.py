@@ -0,0 +1,96 @@
+import hashlib
+import io
+import mmap
+import os
+import struct
+
+from engine import Program, compile_program
+from mach_parser import parse
+
+# Bump whenever the on-disk layout or the table packing changes
+FORMAT_VERSION = 2
+MAGIC = b"TMC\0"
+CACHE_DIRNAME = "__machcache__"
+
+# magic, version, digest, nstates, nsym, init, nfinals, strings length
+_HEADER = struct.Struct("<4sI32sIIIII")
+
+
+def source_digest(source) -> bytes:
+    """Cache key: hash of the .mach bytes plus the format version."""
+    return hashlib.sha256(FORMAT_VERSION.to_bytes(4, "little") + source).digest()
+
+
+def cache_path(filename, digest, cache_dir=None) -> str:
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIRNAME)
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(cache_dir, f"{stem}-{digest.hex()[:16]}.tmc")
+
+
+def _pack_strings(states, symbols) -> bytes:
+    # Names come from .mach words, which never contain NUL
+    return "\0".join(list(states) + list(symbols)).encode()
+
+
+def write_cache(program, path, digest) -> None:
+    """Write `program` to `path` atomically."""
+    strings = _pack_strings(program.states, program.symbols)
+    finals = struct.pack(f"<{len(program.finals)}I", *sorted(program.finals))
+    head = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, digest, len(program.states), program.nsym,
+        program.init, len(program.finals), len(strings),
+    ) + finals + strings
+    # Keep the table 8-byte aligned so it can be cast straight out of the mmap
+    head += bytes(-len(head) % 8)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(head)
+        f.write(memoryview(program.table).cast("B"))
+    os.replace(tmp, path)
+
+
+def read_cache(path, digest=None):
+    """Map a cache file and return its Program, or None if it is stale or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mm) < _HEADER.size:
+        return None
+    magic, version, key, nstates, nsym, init, nfinals, nstrings = _HEADER.unpack_from(mm)
+    if magic != MAGIC or version != FORMAT_VERSION or (digest is not None and key != digest):
+        return None
+    offset = _HEADER.size
+    finals = struct.unpack_from(f"<{nfinals}I", mm, offset)
+    offset += 4 * nfinals
+    names = bytes(mm[offset:offset + nstrings]).decode().split("\0")
+    states, symbols = names[:nstates], names[nstates:]
+    offset += nstrings
+    offset += -offset % 8
+    size = 8 * nstates * nsym
+    if len(symbols) != nsym or len(mm) != offset + size:
+        return None
+    # The table is used in place (native byte order), the view keeps the mapping alive
+    table = memoryview(mm)[offset:offset + size].cast("q")
+    return Program(states, symbols, init, finals, table)
+
+
+def load_program(filename, cache_dir=None) -> Program:
+    """Load a compiled .mach program, parsing and caching it on a miss."""
+    with open(filename, "rb") as f:
+        source = f.read()
+    digest = source_digest(source)
+    path = cache_path(filename, digest, cache_dir)
+    program = read_cache(path, digest)
+    if program is None:
+        spec = parse(io.StringIO(source.decode()), filename)
+        program = compile_program(spec.init, spec.finals, spec.delta)
+        try:
+            write_cache(program, path, digest)
+        except OSError:
+            pass  # a read-only tree just means no cache
+    return program
@@ -0,0 +1,203 @@
+import re
+from typing import NamedTuple
+
+from engine import MOVES
+
+# Characters read from the source per chunk, tokens spanning chunks are carried over
+CHUNK_SIZE = 1 << 16
+
+# Section names and their aliases
+SECTIONS = {
+    "start": "init", "init": "init",
+    "final": "finals", "finals": "finals", "accept": "finals",
+    "del": "delta", "delta": "delta", "transitions": "delta",
+}
+
+_TOKEN = re.compile(r"""
+    (?P<nl>\n)
+  | (?P<ws>[ \t\r\f\v]+)
+  | (?P<line_comment>//[^\n]*)
+  | (?P<block_comment>/\*(?:[^*]|\*(?!/))*(?:\*/)?)
+  | (?P<punct>[:{}(),])
+  | (?P<word>(?:[^\s:{}(),/]|/(?![/*]))+)
+""", re.VERBOSE)
+
+# Fast path for the common one-line "(q, a, q', b, >)" form, anything else
+# goes through the general token-by-token path
+_FIELD = r"[ \t]*([^\s:{}(),/]+)[ \t]*"
+_TUPLE = re.compile(r"\(" + ",".join([_FIELD] * 5) + r"\)")
+
+
+class Transition(NamedTuple):
+    state: str
+    symbol: str
+    new_state: str
+    write: str
+    direction: str
+
+
+class MachineSpec(NamedTuple):
+    init: str
+    finals: frozenset
+    delta: list
+
+
+class Token(NamedTuple):
+    kind: str
+    value: object
+    line: int
+    col: int
+
+
+class MachSyntaxError(SyntaxError):
+    pass
+
+
+def tokenize(stream, filename="<mach>"):
+    """Yield tokens from a text stream, reading it in fixed-size chunks."""
+    buf = ""
+    base = 0  # absolute offset of buf[0]
+    line, line_start = 1, 0
+    eof = False
+    while not eof:
+        chunk = stream.read(CHUNK_SIZE)
+        eof = not chunk
+        buf += chunk
+        pos = 0
+        while pos < len(buf):
+            if buf[pos] == "(":
+                m = _TUPLE.match(buf, pos)
+                if m is not None and (m.end() < len(buf) or eof):
+                    yield Token("tuple", m.groups(), line, base + pos - line_start + 1)
+                    pos = m.end()
+                    continue
+            m = _TOKEN.match(buf, pos)
+            if m is None:
+                raise MachSyntaxError(
+                    f"Unexpected character {buf[pos]!r}",
+                    (filename, line, base + pos - line_start + 1, None),
+                )
+            # A token touching the end of the buffer may continue in the next chunk
+            if m.end() == len(buf) and not eof:
+                break
+            kind = m.lastgroup
+            col = base + pos - line_start + 1
+            if kind == "nl":
+                line += 1
+                line_start = base + m.end()
+            elif kind == "block_comment":
+                text = m.group()
+                if not text.endswith("*/") or len(text) < 4:
+                    raise MachSyntaxError("Unterminated comment", (filename, line, col, None))
+                newlines = text.count("\n")
+                if newlines:
+                    line += newlines
+                    line_start = base + pos + text.rindex("\n") + 1
+            elif kind == "punct" or kind == "word":
+                yield Token(m.group() if kind == "punct" else kind, m.group(), line, col)
+            pos = m.end()
+        buf = buf[pos:]
+        base += pos
+    yield Token("eof", "", line, base - line_start + 1)
+
+
+class _Parser:
+    def __init__(self, tokens, filename) -> None:
+        self.tokens = tokens
+        self.filename = filename
+        self.tok = next(tokens)
+
+    def error(self, msg, tok=None):
+        tok = tok or self.tok
+        return MachSyntaxError(msg, (self.filename, tok.line, tok.col, None))
+
+    def advance(self) -> Token:
+        tok = self.tok
+        self.tok = next(self.tokens)
+        return tok
+
+    def expect(self, kind) -> Token:
+        if self.tok.kind != kind:
+            found = self.tok.value or "end of file"
+            raise self.error(f"Expected {kind!r}, found {found!r}")
+        return self.advance()
+
+    def skip_comma(self) -> None:
+        if self.tok.kind == ",":
+            self.advance()
+
+    def names(self) -> list:
+        if self.tok.kind != "{":
+            return [self.expect("word").value]
+        self.advance()
+        names = []
+        while self.tok.kind != "}":
+            names.append(self.expect("word").value)
+            self.skip_comma()
+        self.advance()
+        return names
+
+    def transition(self) -> Transition:
+        if self.tok.kind == "tuple":
+            start = self.advance()
+            fields = start.value
+        else:
+            # Fields may be separated by commas, whitespace or newlines
+            start = self.expect("(")
+            fields = []
+            while self.tok.kind != ")":
+                fields.append(self.expect("word").value)
+                self.skip_comma()
+            self.advance()
+        if len(fields) != 5:
+            raise self.error(f"Transition needs 5 fields, got {len(fields)}", start)
+        if fields[4] not in MOVES:
+            raise self.error(f"Unknown direction {fields[4]!r}", start)
+        return Transition(*fields)
+
+    def transitions(self, delta) -> None:
+        if self.tok.kind != "{":
+            delta.append(self.transition())
+            return
+        self.advance()
+        while self.tok.kind != "}":
+            delta.append(self.transition())
+            self.skip_comma()
+        self.advance()
+
+    def parse(self) -> MachineSpec:
+        init = None
+        finals = []
+        delta = []
+        seen = set()
+        while self.tok.kind != "eof":
+            name = self.expect("word")
+            section = SECTIONS.get(name.value.lower())
+            if section is None:
+                raise self.error(f"Unknown section {name.value!r}", name)
+            if section in seen:
+                raise self.error(f"Duplicate section {name.value!r}", name)
+            seen.add(section)
+            self.expect(":")
+            if section == "delta":
+                self.transitions(delta)
+            elif section == "finals":
+                finals = self.names()
+            else:
+                names = self.names()
+                if len(names) != 1:
+                    raise self.error(f"Expected a single start state, got {len(names)}", name)
+                init = names[0]
+        if init is None:
+            raise self.error("Missing start state")
+        return MachineSpec(init, frozenset(finals), delta)
+
+
+def parse(stream, filename="<mach>") -> MachineSpec:
+    """Parse a .mach source from a text stream in one pass."""
+    return _Parser(tokenize(stream, filename), filename).parse()
+
+
+def parse_file(filename) -> MachineSpec:
+    with open(filename) as f:
+        return parse(f, filename)
@@ -0,0 +1,180 @@
+import re
+
+from engine import HALTED, LOOPING, OUT_OF_STEPS, RunResult
+
+# Width of the tape blocks macro transitions are cached over
+BLOCK = 8
+# Longest in-block simulation worth caching, beyond that we fall back to single steps
+STEP_CAP = 4096
+# Macro cache entries kept before the cache is dropped and rebuilt
+MAX_MACROS = 1 << 20
+
+
+class MacroRunner:
+    """Accelerated executor for a compiled Program, exact to the step.
+
+    Two shortcuts are layered over the plain single-step loop:
+
+    * sweeps: a transition that keeps the state and moves the head is
+      applied to the whole run of its symbol in one slice assignment;
+    * macros: the effect of entering a `block`-wide tape window in a given
+      state and offset (new window contents, exit state, exit side and
+      step count) is simulated once and cached.
+
+    Whenever a shortcut would overshoot `max_steps` the runner single
+    steps, so step counts, heads and tapes match Program.run exactly.
+    """
+
+    def __init__(self, program, block=BLOCK) -> None:
+        self.program = program
+        self.block = block
+        self.macros = {}
+        # One "anything but this symbol" pattern per symbol, used to find run ends
+        self._other = [re.compile(b"[^" + re.escape(bytes([s])) + b"]") for s in range(program.nsym)]
+        self.sweeps = 0
+        self.macro_hits = 0
+        self.macro_misses = 0
+
+    def _simulate(self, base, pos, window):
+        """Run inside one block until the head leaves it or the machine halts."""
+        table = self.program.table
+        k = self.block
+        blk = bytearray(window)
+        n = 0
+        while 0 <= pos < k:
+            e = table[base + blk[pos]]
+            if not e:
+                break
+            if n == STEP_CAP:
+                return None
+            blk[pos] = (e >> 8) & 0xFF
+            pos += (e & 0xFF) - 2
+            base = e >> 16
+            n += 1
+        return (bytes(blk), base, pos, n)
+
+    def _rfind_other(self, cells, head, sym) -> int:
+        """Last index <= head not holding `sym`, -1 if the run reaches the start."""
+        s = bytes([sym])
+        hi = head + 1
+        size = 64
+        while hi > 0:
+            lo = max(0, hi - size)
+            kept = len(cells[lo:hi].rstrip(s))
+            if kept:
+                return lo + kept - 1
+            hi = lo
+            size *= 2
+        return -1
+
+    def _sweep(self, tape, head, sym, write, mv, remaining):
+        """Apply a self-loop over the run of `sym` at head, returns (steps, head).
+
+        steps is None when the run is an endless stretch of blanks and there
+        is no step budget, i.e. the machine provably never halts.
+        """
+        cells = tape.cells
+        if mv > 0:
+            m = self._other[sym].search(cells, head)
+            endless = m is None
+            n = (len(cells) if endless else m.start()) - head
+        else:
+            i = self._rfind_other(cells, head, sym)
+            endless = i < 0
+            n = head - i
+        # Past the buffer everything is blank, so a blank run there never ends
+        if endless and sym == tape.blank:
+            if remaining is None:
+                return None, head
+            n = remaining
+        if remaining is not None:
+            n = min(n, remaining)
+
+        if mv > 0:
+            if head + n > len(cells):
+                tape.grow_right(head + n - len(cells))
+            lo = head
+            head += n
+        else:
+            if head - n + 1 < 0:
+                tape.head = head
+                tape.grow_left(n - head - 1)
+                head = tape.head
+            head -= n
+            lo = head + 1
+        if write != sym:
+            cells[lo:lo + n] = bytes([write]) * n
+        self.sweeps += 1
+        return n, head
+
+    def run(self, tape="", max_steps=None, state=None) -> RunResult:
+        program = self.program
+        if max_steps is not None and max_steps < 0:
+            raise ValueError(f"max_steps must be >= 0, got {max_steps}")
+        if isinstance(tape, str):
+            tape = program.load(tape)
+        table = program.table
+        nsym = program.nsym
+        k = self.block
+        macros = self.macros
+        cells = tape.cells
+        head = tape.head
+        base = (program.init if state is None else program.state_ids[state]) * nsym
+        limit = max_steps
+        steps = 0
+        status = OUT_OF_STEPS
+
+        while limit is None or steps < limit:
+            sym = cells[head]
+            e = table[base + sym]
+            if not e:
+                status = HALTED
+                break
+            mv = (e & 0xFF) - 2
+            if e >> 16 == base and mv:
+                tape.head = head
+                n, head = self._sweep(tape, head, sym, (e >> 8) & 0xFF, mv,
+                                      None if limit is None else limit - steps)
+                if n is None:
+                    status = LOOPING
+                    break
+                steps += n
+            elif e >> 16 == base and (e >> 8) & 0xFF == sym:
+                # Rewrites its own symbol in place forever
+                if limit is None:
+                    status = LOOPING
+                else:
+                    steps = limit
+                break
+            else:
+                lo = head - head % k
+                if lo + k > len(cells):
+                    tape.grow_right(lo + k - len(cells))
+                key = (base, head - lo, bytes(cells[lo:lo + k]))
+                m = macros.get(key, False)
+                if m is False:
+                    self.macro_misses += 1
+                    if len(macros) >= MAX_MACROS:
+                        macros.clear()
+                    m = macros[key] = self._simulate(base, head - lo, key[2])
+                else:
+                    self.macro_hits += 1
+                if m is not None and (limit is None or steps + m[3] <= limit):
+                    cells[lo:lo + k] = m[0]
+                    base = m[1]
+                    head = lo + m[2]
+                    steps += m[3]
+                else:
+                    cells[head] = (e >> 8) & 0xFF
+                    head += mv
+                    base = e >> 16
+                    steps += 1
+            if head < 0:
+                # grow_left also shifts tape.head, which only has to stay a valid index here
+                head += tape.grow_left()
+            elif head >= len(cells):
+                tape.grow_right(head - len(cells) + 1)
+
+        tape.head = head
+        state = base // nsym
+        return RunResult(status, program.states[state], state in program.finals, steps, tape.position, tape)
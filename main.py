@@ -1,5 +1,13 @@
 import os
 import json
+import argparse
+
+from batch import run_batch
+from bounded import run_bounded
+from engine import compile_program
+from macro import MacroRunner
+from mach_cache import load_program
+from mach_parser import parse_file
 
 DEFAULT_FILENAME = "main.mach"
 
@@ -7,49 +15,71 @@ class Machine:
     init = "q0"
     final="qf"
     transition=[]
-    tapeStr = '_'
-    tapeList = ["_"]
+    tapeStr = ''
     
-    def __init__(self,init,final,trans) -> None:
+    def __init__(self,init,final,trans,program=None) -> None:
         self.init = init;
         self.final = final
         self.transition = trans
+        self.program = program or compile_program(init, final, trans)
+
+    @classmethod
+    def from_file(cls, filename=DEFAULT_FILENAME, cache_dir=None) -> "Machine":
+        """Load a machine through the compiled-program cache, skipping the parser on a hit."""
+        program = load_program(filename, cache_dir)
+        finals = {program.states[s] for s in program.finals}
+        return cls(program.states[program.init], finals, None, program)
     
     def compile(self)->None:
        tapeInput = input("Enter Input String Load on Tape: ")
-       self.tape = f"_{tapeInput}_"
+       self.tapeStr = tapeInput
        
-    def concurrentRun(self)->str:
-        self.tapeList = list(self.tapeStr)
-        return "A"
+    def concurrentRun(self, max_steps=None, accelerate=False)->str:
+        runner = MacroRunner(self.program) if accelerate else self.program
+        self.result = runner.run(self.tapeStr, max_steps)
+        return "A" if self.result.accepted else "R"
+
+    def batchRun(self, inputs, max_steps=None, workers=None, accelerate=False) -> list:
+        """Run every input string through the machine across a process pool."""
+        return list(run_batch(self.program, inputs, max_steps, workers, accelerate=accelerate))
+
+    def boundedRun(self, max_steps=None, max_cells=None, detect_loops=True, accelerate=False) -> str:
+        """Run under step/tape budgets, stopping early on a detected loop."""
+        runner = MacroRunner(self.program) if accelerate else self.program
+        self.result = run_bounded(runner, self.tapeStr, max_steps, max_cells, detect_loops)
+        return self.result.status
         
        
     
 
 
 
-def read_mach(filename = DEFAULT_FILENAME):
-    with open(filename) as f:
-        code = f.read()
-        return code
-
-def process_code(filename):
-    raw_code = read_mach(filename)
-    split_code = raw_code.split(":")
-    for i in range(0,len(split_code)):
-        split_code[i] = split_code[i].split("\n")
-    for i in range(0,len(split_code)):
-        if(type(split_code)==list):
-            try:
-                split_code[i] = split_code[i].remove("")
-            except:
-                pass
-    inline_code = []
-    for i in split_code:
-        if( i != None and i != []):
-            for j in i:
-                inline_code.append(j.strip())
-    print(inline_code)
+def process_code(filename = DEFAULT_FILENAME):
+    return parse_file(filename)
+
+
+def _budget(text):
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0, got {value}")
+    return value
     
 if __name__ == "__main__":
-    process_code(DEFAULT_FILENAME)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run a .mach Turing machine")
+    parser.add_argument("filename", nargs="?", default=DEFAULT_FILENAME)
+    parser.add_argument("--input", help="tape input, prompted for when omitted")
+    parser.add_argument("--max-steps", type=_budget, help="stop after this many steps")
+    parser.add_argument("--max-cells", type=_budget, help="stop once the tape spans this many cells")
+    parser.add_argument("--no-loop-check", action="store_true", help="disable cycle detection")
+    parser.add_argument("--accelerate", action="store_true", help="use sweep/macro-step acceleration")
+    args = parser.parse_args()
+
+    machine = Machine.from_file(args.filename)
+    if args.input is None:
+        machine.compile()
+    else:
+        machine.tapeStr = args.input
+    status = machine.boundedRun(args.max_steps, args.max_cells, not args.no_loop_check, args.accelerate)
+    result = machine.result
+    print(status, result.state, "A" if result.accepted else "R",
+          f"steps={result.steps} cells={result.cells} checks={result.checks} period={result.period}")
\ No newline at end of file
@@ -2,28 +2,17 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from scipy.optimize import curve_fit
-from scipy.integrate import quad
+
+from cosmology import luminosity_distance_drag, luminosity_distance_lcdm
 
 # Constants
 H0 = 70  # Hubble constant in km/s/Mpc
-c = 3e5  # Speed of light in km/s
 Omega_m = 0.3  # Matter density parameter
 Omega_L = 0.7  # Dark energy density parameter
-Omega_k = 1.0 - Omega_m - Omega_L  # Curvature density parameter
-
-# Function for E(z) in ΛCDM model
-def E(z):
-    return np.sqrt(Omega_m * (1 + z)**3 + Omega_k * (1 + z)**2 + Omega_L)
-
-# Proper luminosity distance in ΛCDM model
-def luminosity_distance_lcdm(z):
-    integral, _ = quad(lambda z_: 1/E(z_), 0, z)
-    return (c / H0) * (1 + z) * integral
 
-# Modified Photon Drag Model with only alpha
-# d_L = (c/H0) * (1+z) * exp(-alpha * ln(1+z))
-def luminosity_distance_drag(z, alpha):
-    return (c / H0) * (1 + z) * np.exp(-alpha * np.log(1 + z))
+# Distances come from cosmology.py: ΛCDM reads cached integral tables instead of
+# calling quad per redshift, and the photon drag model there is
+# d_L = (c/H0) * (1+z) * exp(-alpha * ln(1+z)) with only alpha fitted below
 
 # Load latest Pantheon+ Supernova Data from File
 file_path = "lcparam_full_long.txt"
@@ -50,7 +39,7 @@ alpha_fit = popt[0]
 
 # Generate redshift values for plotting
 z_values = np.linspace(0.01, max(z_obs), 100)
-d_lcdm = np.array([luminosity_distance_lcdm(z) for z in z_values])
+d_lcdm = luminosity_distance_lcdm(z_values, H0, Omega_m, Omega_L)
 d_drag = luminosity_distance_drag(z_values, alpha_fit)
 
 # Plot comparison
@@ -1,8 +1,21 @@
 import pygame 
-import csv
-from math import sin, cos, sqrt, radians
+import os
+import time
+import argparse
+import numpy as np
+from math import sqrt
 from random import random
 
+from kinematics import Chain
+from colstore import ColumnWriter
+from config_index import ConfigIndex
+from ik import SOLVERS, solve
+from ik_sweep import ReachGrid
+from policy import ACTION_STEP, Perceptron, observe
+from profiling import Profiler
+from telemetry import LEVELS, JsonLinesSink, Telemetry
+from trajlog import ARM_COLUMNS, TrajectoryWriter
+
 
 # Colors
 RED = (255, 0, 0)
@@ -11,47 +24,178 @@ WHITE = (255, 255, 255)
 BLUE = (0, 0, 255)
 GREEN = (0, 255, 0)
 
-# trying to implement deep q learning
-class Perceptron:
-    def __init__(self, neurons_count):
-        self.neurons = neurons_count
-        self.weights = [random() for i in self.neurons]
-        
-
-# Function to append to CSV
-def append_file(writer, headers, data):
-    file_exists = False
-    try:
-        with open(writer, 'r') as csvfile:
-            rows = list(csv.reader(csvfile))
-            file_exists = bool(rows)
-            last_row = rows[-1] if rows else None
-    except FileNotFoundError:
-        last_row = None
-    
-    if last_row and last_row == data:
-        return  # Avoid appending duplicate last value
-    
-    with open(writer, 'a', newline='') as csvfile:
-        csv_writer = csv.writer(csvfile)
-        if not file_exists:
-            csv_writer.writerow(headers)
-        csv_writer.writerow(data)
-
 # Function to calculate distance
 def distance(coord1, coord2):
     return sqrt((coord1[0] - coord2[0])**2 + (coord1[1] - coord2[1])**2)
 
-# Playground Class
-class Playground(): 
-    def __init__(self, winsize=(900, 600)):
+class PygameView:
+    """Window observer for a Playground, redrawn at most `fps` times per wall-clock second.
+
+    The background, target and trail of best points live on a cached
+    surface that only gains the new trail points. Each frame restores the
+    background under the previous arm and labels, draws the new ones and
+    pushes just those rectangles, so a frame costs the same however long
+    the trail gets.
+    """
+    def __init__(self, env, fps=120):
         pygame.init()  # Initialize pygame first
         self.font = pygame.font.Font(None, 36)  # Load font AFTER pygame.init()
-        self.winsize = winsize
-        self.screen = pygame.display.set_mode(self.winsize) 
+        self.screen = pygame.display.set_mode(env.winsize) 
         pygame.display.set_caption("Machine Target Simulation")
+        self.env = env
+        self.interval = 1.0 / fps
+        self.next_frame = 0.0
+        self.background = None
+        self.trail = None  # the gradients list drawn so far and how much of it
+        self.trail_drawn = 0
+        self.target = None
+        self.labels = {}  # center -> (text, surface)
+        self.drawn = []  # rectangles covered by the last frame's arm and labels
+        self.small_font = pygame.font.Font(None, 20)
+        self.profile_lines = []
+        self.profile_next = 0.0
+
+    def poll(self):
+        """Handle window events and arrow keys, False once the window is closed."""
+        for event in pygame.event.get(): 
+            if event.type == pygame.QUIT: 
+                return False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.env.profiler.toggle()
+        angles = self.env.angles
+        keys = pygame.key.get_pressed()
+        if keys[pygame.K_LEFT]:
+            angles[0] += 0.5
+        if keys[pygame.K_RIGHT]:
+            angles[0] -= 0.5
+        if keys[pygame.K_UP]:
+            angles[1] += 0.5
+        if keys[pygame.K_DOWN]:
+            angles[1] -= 0.5
+        return True
+
+    def observe(self, counter):
+        """Sample the simulation if a frame is due, False once the window is closed."""
+        now = time.monotonic()
+        if now < self.next_frame:
+            return True
+        self.next_frame = now + self.interval
+        profiler = self.env.profiler
+        with profiler.phase("poll"):
+            if not self.poll():
+                return False
+        with profiler.phase("draw"):
+            self.draw(counter)
+        return True
+
+    def draw_target(self, surface):
+        env = self.env
+        if env.target is not None and (0 <= env.target[0] < env.winsize[0]) and (0 <= env.target[1] < env.winsize[1]):
+            return pygame.draw.circle(surface, BLUE, (env.target[0], env.target[1]), 5)
+        return None
+
+    def update_background(self):
+        """Bring the static layer up to date, returns the rectangles that changed or None for all of it."""
+        env = self.env
+        if self.background is None or env.target != self.target or env.gradients is not self.trail \
+                or len(env.gradients) < self.trail_drawn:
+            self.background = pygame.Surface(self.screen.get_size()).convert()
+            self.background.fill(WHITE)
+            self.target = env.target
+            self.trail = env.gradients
+            self.trail_drawn = 0
+            changed = None
+        else:
+            changed = []
+        new_points = env.gradients[self.trail_drawn:]
+        for i in new_points:
+            rect = pygame.draw.circle(self.background, YELLOW, i, 5)
+            if changed is not None:
+                changed.append(rect)
+        self.trail_drawn = len(env.gradients)
+        # The target sits on top of the trail
+        if new_points or changed is None:
+            self.draw_target(self.background)
+        return changed
+
+    def label(self, text, color, center):
+        """Blit a text label, rendering it again only when the text changed."""
+        cached = self.labels.get(center)
+        if cached is None or cached[0] != text:
+            cached = (text, self.font.render(text, True, color))
+            self.labels[center] = cached
+        surface = cached[1]
+        return self.screen.blit(surface, surface.get_rect(center=center))
+
+    def draw_profile(self):
+        """Per-phase p50/p99 in the bottom-left corner, refreshed once a second."""
+        now = time.monotonic()
+        if now >= self.profile_next:
+            self.profile_next = now + 1.0
+            self.profile_lines = [
+                self.small_font.render(f"{name}: p50 {r['p50_us']:.0f} us  p99 {r['p99_us']:.0f} us", True, BLUE)
+                for name, r in self.env.profiler.summary().items()
+            ]
+        y = self.screen.get_height() - 18 * len(self.profile_lines) - 5
+        rects = []
+        for surface in self.profile_lines:
+            rects.append(self.screen.blit(surface, (5, y)))
+            y += 18
+        return rects
+
+    def draw(self, counter):
+        env = self.env
+        profiler = env.profiler
+        changed = self.update_background()
+        if changed is None:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            changed.extend(self.drawn)
+            for rect in changed:
+                self.screen.blit(self.background, rect, rect)
+
+        # Draw the machine arm with joints
+        drawn = []
+        if env.geometry is not None:
+            for i in range(len(env.geometry) - 1):
+                drawn.append(pygame.draw.line(self.screen, env.geometry[i][0], env.geometry[i][1], env.geometry[i+1][1], 5))
+                drawn.append(pygame.draw.circle(self.screen, GREEN, env.geometry[i][1], 4))
+            drawn.append(pygame.draw.circle(self.screen, GREEN, env.geometry[-1][1], 5))
+
+        # Display text
+        with profiler.phase("text"):
+            drawn.append(self.label(env.state, RED, (700, 50)))
+            drawn.append(self.label(f"Iteration: {counter}", GREEN, (700, 25)))
+            if profiler.enabled:
+                drawn.extend(self.draw_profile())
+
+        with profiler.phase("display"):
+            if changed is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(changed + drawn)
+        self.drawn = drawn
+
+    def close(self):
+        pygame.quit()
+
+# Playground Class
+class Playground(): 
+    def __init__(self, winsize=(900, 600), solver=None, grid=None, index=None, neighbours=4, policy=None,
+                 telemetry=None, profiler=None):
+        self.winsize = winsize
+        self.telemetry = telemetry or Telemetry()  # closed at the end of run()
+        self.profiler = profiler or Profiler()  # disabled unless switched on
+        self.solver = solver  # name of an ik.SOLVERS entry, None for random search
+        self.policy = policy  # optional policy.Perceptron Q-network, used when there is no solver
+        self.grid = grid  # optional ReachGrid seeding the solver
+        self.index = index  # optional ConfigIndex of known configurations, in degrees
+        self.neighbours = neighbours
+        self.ik_result = None
         self.target = None
         self.geometry = None
+        self.chain = None
+        self.log = None
         self.angles = [0, 0, 0, 0]  # Individual angles for each joint
         self.state = "Initiating Controllable"
         self.q_table = {
@@ -62,12 +206,8 @@ class Playground():
         self.gradients = []
         
 
-    def init_target(self):
-        """Draw the target point."""
-        if self.target is not None and (0 <= self.target[0] < self.winsize[0]) and (0 <= self.target[1] < self.winsize[1]):
-            pygame.draw.circle(self.screen, BLUE, (self.target[0], self.target[1]), 5)
-
     def init_machine(self):
+        """Move the machine arm joints to the current angles."""
         
         for i in range(len(self.angles)):
             if self.angles[i] > 360:
@@ -75,105 +215,133 @@ class Playground():
             elif self.angles[i] < -360:
                 self.angles[i] += 360
         
-        """Draw the machine arm with joints."""
-        
         if self.geometry is None:
             return
-        
-        for i in range(len(self.geometry) - 1):
-            pygame.draw.line(self.screen, self.geometry[i][0], self.geometry[i][1], self.geometry[i+1][1], 5)
-            pygame.draw.circle(self.screen, GREEN, self.geometry[i][1], 4)
-        pygame.draw.circle(self.screen, GREEN, self.geometry[-1][1], 5)
-
-        # Update the joint positions
-        original_lengths = [
-            distance(self.geometry[i][1], self.geometry[i+1][1]) for i in range(len(self.geometry) - 1)
-        ]
-        
-        for i in range(len(self.geometry) - 1):
-            cx, cy = self.geometry[i][1]
-            angle = radians(self.angles[i])
-            new_x = cx + original_lengths[i] * cos(angle)
-            new_y = cy + original_lengths[i] * sin(angle)
-            self.geometry[i+1][1] = [new_x, new_y]
+
+        # Update the joint positions from the fixed link lengths
+        points = self.chain.positions(np.radians(self.angles))
+        for i in range(1, len(self.geometry)):
+            self.geometry[i][1] = points[i].tolist()
 
     def reset_env(self,counter,mod):
         if counter%mod==0:
             for i in range(len(self.angles)-1):
                 self.angles[i] = int(random()*360)
-        for i in self.gradients:
-            pygame.draw.circle(self.screen, YELLOW, i, 5)
-            pygame.display.flip()
+
+    def seeds(self):
+        """Solver starting angles in radians, best guesses first."""
+        seeds = []
+        if self.grid is not None:
+            seeds.append(self.grid.lookup(*self.target).angles)
+        if self.index is not None and len(self.index):
+            seeds.extend(np.radians(self.index.nearest(self.target, self.neighbours)[1]))
+        return seeds or [None]
+
+    def solve_target(self):
+        """Replace the random restarts with inverse-kinematics solves from the known seeds."""
+        n = self.chain.n_links
+        self.ik_result = None
+        for initial in self.seeds():
+            result = solve(self.chain, self.target, self.solver, initial=initial)
+            if self.ik_result is None or result.error < self.ik_result.error:
+                self.ik_result = result
+            if result.converged:
+                break
+        self.angles[:n] = np.degrees(self.ik_result.angles).tolist()
+
+    def policy_step(self):
+        """Turn one joint the way the trained Q-network rates best."""
+        n = self.chain.n_links
+        obs = observe(self.chain, np.radians(self.angles[:n]), np.asarray(self.target, dtype=float))
+        joint, backwards = divmod(int(self.policy(obs[None]).argmax()), 2)
+        turn = float(np.degrees(ACTION_STEP))
+        self.angles[joint] += -turn if backwards else turn
+
+    def remember(self):
+        """Add the current configuration to the index."""
+        if self.index is not None and self.geometry is not None:
+            self.index.insert(self.geometry[-1][1], self.angles)
 
     def calculate_q_table(self):
         if distance(self.geometry[-1][-1],self.target)<self.q_table["Loss"]:
             self.q_table["Angles"] = self.angles[:]  # Shallow copy to prevent reference issues
-            print("Understood")
+            self.telemetry.info("improved", loss=distance(self.geometry[-1][-1],self.target), angles=self.angles[:])
             self.gradients.append(self.geometry[-1][-1])
             self.q_table["Loss"] = distance(self.geometry[-1][-1],self.target)
             self.state = f"{self.q_table["Loss"]}"
-            
-    def run(self):
-        """Main loop for running the simulation."""
-        clock = pygame.time.Clock()
-        running = True
-        FPS = 120
-        counter = 0
-        
-        while running:             
-            clock.tick(FPS)
-            counter+=1
-            for event in pygame.event.get(): 
-                if event.type == pygame.QUIT: 
-                    running = False                                     
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_LEFT]:
-                self.angles[0] += 0.5
-            if keys[pygame.K_RIGHT]:
-                self.angles[0] -= 0.5
-            if keys[pygame.K_UP]:
-                self.angles[1] += 0.5
-            if keys[pygame.K_DOWN]:
-                self.angles[1] -= 0.5
-
-            if self.acceptance_limit>=self.q_table["Loss"]:
-                self.angles = self.q_table["Angles"]
+
+    def step(self, counter):
+        """One search iteration, independent of any rendering."""
+        profiler = self.profiler
+        if self.acceptance_limit>=self.q_table["Loss"]:
+            self.angles = self.q_table["Angles"]
+            with profiler.phase("reset_env"):
                 self.reset_env(1, 10)
-                self.state = "Final Config: " + f"{int(self.q_table["Loss"])}"
+            self.state = "Final Config: " + f"{int(self.q_table["Loss"])}"
+            with profiler.phase("init_machine"):
+                self.init_machine()
+        else:
+            if self.solver is not None:
+                with profiler.phase("solve_target"):
+                    self.solve_target()
+            elif self.policy is not None:
+                with profiler.phase("policy_step"):
+                    self.policy_step()
             else:
-                self.reset_env(counter,2)
-            self.screen.fill(WHITE)
-            self.init_target()
-            self.init_machine()
+                with profiler.phase("reset_env"):
+                    self.reset_env(counter,2)
+            with profiler.phase("init_machine"):
+                self.init_machine()
+            with profiler.phase("remember"):
+                self.remember()
+        with profiler.phase("calculate_q_table"):
             self.calculate_q_table()
 
-            # Display text
-            text = self.font.render(self.state, True, RED)  
-            text_rect = text.get_rect(center=(700, 50))  
-            self.screen.blit(text, text_rect) 
-            
-            text = self.font.render(f"Iteration: {counter}", True, GREEN)  
-            text_rect = text.get_rect(center=(700, 25))  
-            self.screen.blit(text, text_rect) 
+        with profiler.phase("telemetry"):
+            self.telemetry.debug("step", counter=counter, angles=self.angles[:], loss=self.q_table["Loss"])
 
-            print(self.angles, self.q_table)
-            
-                
-
-            # Append data to file
-            if self.geometry and self.target:
-                append_file(
-                    f"target-{self.target}-def-mach-config.csv",
-                    ["X0", "Y0", "X1", "Y1", "XF", "YF", "Angle0", "Angle1", "TargetX", "TargetY"],
+        # Append data to file
+        if self.log is not None and self.geometry:
+            with profiler.phase("log"):
+                self.log.append(
                     [self.geometry[0][1][0], self.geometry[0][1][1], 
                      self.geometry[1][1][0], self.geometry[1][1][1], 
                      self.geometry[2][1][0], self.geometry[2][1][1], 
                      self.angles[0], self.angles[1], self.target[0], self.target[1]]
                 )
+            
+    def run(self, headless=False, fps=120, max_iterations=None, binary_log=False):
+        """Main loop for running the simulation.
 
-            pygame.display.flip()
+        The search runs as fast as the CPU allows. Unless `headless`, a
+        PygameView samples it `fps` times per second; headless runs never
+        touch pygame and so work without a display. `binary_log` writes
+        the trajectory to a columnar .cols store instead of CSV.
+        """
+        view = None if headless else PygameView(self, fps)
+        if self.target:
+            name = f"target-{self.target}-def-mach-config"
+            if binary_log:
+                self.log = ColumnWriter(f"{name}.cols", ARM_COLUMNS, dedup=True)
+            else:
+                self.log = TrajectoryWriter(f"{name}.csv")
+        running = True
+        counter = 0
         
-        pygame.quit()
+        try:
+            while running:             
+                counter+=1
+                self.step(counter)
+                if view is not None:
+                    running = view.observe(counter)
+                if max_iterations is not None and counter >= max_iterations:
+                    running = False
+        finally:
+            if self.log is not None:
+                self.log.close()
+            if view is not None:
+                view.close()
+            self.telemetry.close()
     
     def set_target(self, point):
         """Set the target coordinates."""
@@ -182,6 +350,16 @@ class Playground():
     def set_machine(self, geometry):
         """Set the machine's joint positions."""
         self.geometry = geometry
+        self.chain = Chain.from_points([p for _, p in geometry], cumulative=False)
+        if self.index is not None:
+            self.index.match_chain(self.chain)
+        # Fail here rather than on the first step of run()
+        n = self.chain.n_links
+        if self.policy is not None and (self.policy.neurons[0], self.policy.neurons[-1]) != (2 * n + 2, 2 * n):
+            raise ValueError(f"The policy network maps {self.policy.neurons[0]} inputs to {self.policy.neurons[-1]} "
+                             f"actions, a {n}-link machine needs {2 * n + 2} to {2 * n}")
+        if self.solver == "analytic" and n != 2:
+            raise ValueError(f"The analytic solver needs a 2-link machine, this one has {n} links")
 
 # Run the simulation
 if __name__ == "__main__":
@@ -191,7 +369,44 @@ if __name__ == "__main__":
         [RED, [300, 200]],
         [RED, [300, 100]],
     ]
-    env = Playground()
+    parser = argparse.ArgumentParser(description="Machine target simulation")
+    parser.add_argument("--headless", action="store_true", help="run the search without a window")
+    parser.add_argument("--iterations", type=int, help="stop after this many iterations")
+    parser.add_argument("--binary-log", action="store_true", help="log to a columnar .cols store")
+    parser.add_argument("--solver", choices=sorted(SOLVERS), help="solve with inverse kinematics instead of random search (analytic needs a 2-link machine)")
+    parser.add_argument("--grid", help="ik_sweep.py lookup grid used to seed the solver")
+    parser.add_argument("--policy", help="policy.py Q-network driving the arm instead of random search")
+    parser.add_argument("--telemetry", help="write telemetry as JSON lines to this file instead of stdout")
+    parser.add_argument("--log-level", choices=sorted(LEVELS), default="info", help="debug also reports every step")
+    parser.add_argument("--log-rate", type=float, default=10.0, help="most step records per second")
+    parser.add_argument("--profile", action="store_true", help="time every phase (F3 toggles it in the window)")
+    parser.add_argument("--profile-out", help="write the per-phase p50/p99 summary as JSON to this file")
+    parser.add_argument("--index", help="config_index.py index seeding the solver, extended and saved by the run")
+    args = parser.parse_args()
+
+    grid = ReachGrid.load(args.grid) if args.grid else None
+    index = None
+    if args.index and os.path.exists(args.index):
+        try:
+            index = ConfigIndex.load(args.index)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.index:
+        index = ConfigIndex(len(mach_config) - 1)
+    policy = Perceptron.load(args.policy) if args.policy else None
+    telemetry = Telemetry(JsonLinesSink(args.telemetry) if args.telemetry else None, LEVELS[args.log_level])
+    telemetry.configure("step", max_rate=args.log_rate)
+    env = Playground(solver=args.solver or ("dls" if grid or index else None), grid=grid, index=index, policy=policy,
+                     telemetry=telemetry, profiler=Profiler(args.profile))
     env.set_target(point=(325, 325))
-    env.set_machine(mach_config)
-    env.run()
+    try:
+        env.set_machine(mach_config)
+    except ValueError as e:
+        parser.error(str(e))
+    env.run(headless=args.headless, max_iterations=args.iterations, binary_log=args.binary_log)
+    if index is not None:
+        index.save(args.index)
+    if env.profiler.histograms:
+        print(env.profiler.report())
+        if args.profile_out:
+            env.profiler.export(args.profile_out)
@@ -0,0 +1,268 @@
+import argparse
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from kinematics import Chain, parse_point
+
+# Joint turn per action in radians: action 2j turns joint j forwards, 2j + 1 backwards
+ACTION_STEP = np.radians(3.0)
+# An episode ends once the end effector is this close, or after this many steps
+GOAL_RADIUS = 10.0
+EPISODE_STEPS = 200
+
+
+def observe(chain, angles, targets) -> np.ndarray:
+    """Network input, shape (..., 2J + 2): cos/sin of every angle and the end-to-target offset over the reach."""
+    offset = (targets - chain.end_effector(angles)) / chain.reach
+    return np.concatenate((np.cos(angles), np.sin(angles), offset), axis=-1).astype(np.float32)
+
+
+class ArmEnv:
+    """n_arms copies of one chain stepped together, each chasing its own target.
+
+    Arms whose episode ends restart on the spot with new angles and a new
+    target, so every step() advances all of them. Nothing here touches pygame.
+    """
+
+    def __init__(self, chain, n_arms=256, seed=None) -> None:
+        self.chain = chain
+        self.n_arms = n_arms
+        self.rng = np.random.default_rng(seed)
+        self.angles = np.zeros((n_arms, chain.n_links))
+        self.targets = np.zeros((n_arms, 2))
+        self.steps = np.zeros(n_arms, dtype=int)
+        self.distance = np.zeros(n_arms)
+        self.reset(np.arange(n_arms))
+
+    @property
+    def obs_size(self) -> int:
+        return 2 * self.chain.n_links + 2
+
+    @property
+    def n_actions(self) -> int:
+        return 2 * self.chain.n_links
+
+    def reset(self, arms) -> None:
+        n = len(arms)
+        self.angles[arms] = self.rng.uniform(-np.pi, np.pi, (n, self.chain.n_links))
+        # Targets uniform over the disc the arm can reach
+        r = self.chain.reach * np.sqrt(self.rng.uniform(0.0, 1.0, n))
+        t = self.rng.uniform(-np.pi, np.pi, n)
+        self.targets[arms] = self.chain.base + np.stack((r * np.cos(t), r * np.sin(t)), axis=-1)
+        self.steps[arms] = 0
+        self.distance[arms] = np.linalg.norm(self.targets[arms] - self.chain.end_effector(self.angles[arms]), axis=-1)
+
+    def observation(self) -> np.ndarray:
+        return observe(self.chain, self.angles, self.targets)
+
+    def step(self, actions):
+        """Apply one action per arm.
+
+        Returns (next_obs, reward, terminal, done): next_obs is observed
+        before finished arms restart, terminal marks arms that reached their
+        target and done also includes those that ran out of steps.
+        """
+        joint, backwards = np.divmod(actions, 2)
+        self.angles[np.arange(self.n_arms), joint] += np.where(backwards, -ACTION_STEP, ACTION_STEP)
+        distance = np.linalg.norm(self.targets - self.chain.end_effector(self.angles), axis=-1)
+        terminal = distance <= GOAL_RADIUS
+        # Progress towards the target, a bonus for reaching it and a small cost per step
+        reward = (self.distance - distance) / GOAL_RADIUS + np.where(terminal, 1.0, -0.01)
+        self.distance = distance
+        self.steps += 1
+        done = terminal | (self.steps >= EPISODE_STEPS)
+        next_obs = self.observation()
+        finished = np.flatnonzero(done)
+        if len(finished):
+            self.reset(finished)
+        return next_obs, reward.astype(np.float32), terminal, done
+
+
+class Perceptron:
+    """Fully connected ReLU network over whole minibatches, trained with Adam.
+
+    `neurons_count` lists the layer widths, inputs first and outputs last.
+    """
+
+    def __init__(self, neurons_count, learning_rate=1e-3, seed=None) -> None:
+        rng = np.random.default_rng(seed)
+        self.neurons = list(neurons_count)
+        sizes = list(zip(self.neurons[:-1], self.neurons[1:]))
+        self.weights = [rng.normal(0.0, np.sqrt(2.0 / n_in), (n_in, n_out)).astype(np.float32) for n_in, n_out in sizes]
+        self.biases = [np.zeros(n_out, dtype=np.float32) for _, n_out in sizes]
+        self.learning_rate = learning_rate
+        self._m = [np.zeros_like(p) for p in self.params]
+        self._v = [np.zeros_like(p) for p in self.params]
+        self._t = 0
+
+    @property
+    def params(self) -> list:
+        return self.weights + self.biases
+
+    def forward(self, x):
+        """Output for a (B, inputs) batch, plus the activations backward() needs."""
+        activations = [x]
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            x = x @ w
+            x += b
+            if i < last:
+                np.maximum(x, 0.0, out=x)
+            activations.append(x)
+        return x, activations
+
+    def __call__(self, x) -> np.ndarray:
+        return self.forward(x)[0]
+
+    def backward(self, activations, grad) -> list:
+        """Gradients of every parameter, in `params` order, from d(loss)/d(output)."""
+        grad_w, grad_b = [], []
+        for i in range(len(self.weights) - 1, -1, -1):
+            grad_w.append(activations[i].T @ grad)
+            grad_b.append(grad.sum(axis=0))
+            if i:
+                grad = grad @ self.weights[i].T
+                grad *= activations[i] > 0
+        return grad_w[::-1] + grad_b[::-1]
+
+    def update(self, grads, beta1=0.9, beta2=0.999, eps=1e-8) -> None:
+        self._t += 1
+        scale = self.learning_rate * np.sqrt(1 - beta2 ** self._t) / (1 - beta1 ** self._t)
+        for p, g, m, v in zip(self.params, grads, self._m, self._v):
+            m *= beta1
+            m += (1 - beta1) * g
+            v *= beta2
+            v += (1 - beta2) * g * g
+            p -= scale * m / (np.sqrt(v) + eps)
+
+    def copy_from(self, other) -> None:
+        """Take over another network's parameters (used for the target network)."""
+        for mine, theirs in zip(self.params, other.params):
+            mine[...] = theirs
+
+    def save(self, path) -> None:
+        np.savez(path, *self.params, neurons=self.neurons)
+
+    @classmethod
+    def load(cls, path) -> "Perceptron":
+        with np.load(path) as f:
+            net = cls(f["neurons"].tolist())
+            for i, p in enumerate(net.params):
+                p[...] = f[f"arr_{i}"]
+        return net
+
+
+class Batch(NamedTuple):
+    obs: np.ndarray
+    actions: np.ndarray
+    rewards: np.ndarray
+    next_obs: np.ndarray
+    terminal: np.ndarray
+
+
+class ReplayBuffer:
+    """Fixed-size transition memory in preallocated arrays, overwritten oldest first."""
+
+    def __init__(self, capacity, obs_size) -> None:
+        self.capacity = capacity
+        self.obs = np.empty((capacity, obs_size), dtype=np.float32)
+        self.next_obs = np.empty((capacity, obs_size), dtype=np.float32)
+        self.actions = np.empty(capacity, dtype=np.int64)
+        self.rewards = np.empty(capacity, dtype=np.float32)
+        self.terminal = np.empty(capacity, dtype=bool)
+        self.head = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def extend(self, obs, actions, rewards, next_obs, terminal) -> None:
+        """Store a batch of transitions, one row per arm."""
+        idx = (self.head + np.arange(len(actions))) % self.capacity
+        self.obs[idx] = obs
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_obs[idx] = next_obs
+        self.terminal[idx] = terminal
+        self.head = (self.head + len(actions)) % self.capacity
+        self.size = min(self.size + len(actions), self.capacity)
+
+    def sample(self, n, rng) -> Batch:
+        idx = rng.integers(0, self.size, n)
+        return Batch(self.obs[idx], self.actions[idx], self.rewards[idx], self.next_obs[idx], self.terminal[idx])
+
+
+class TrainStats(NamedTuple):
+    steps: int  # environment steps, arms x iterations
+    seconds: float
+    episodes: int
+    reached: int
+    loss: float  # mean Huber loss over the last target-sync period
+
+
+def train_dqn(env, net, iterations, buffer=None, gamma=0.98, batch_size=256, epsilon=(1.0, 0.05),
+              target_sync=250, seed=None) -> TrainStats:
+    """Deep Q-learning on a vectorized ArmEnv.
+
+    Every iteration steps all arms epsilon-greedily (epsilon decays linearly
+    over the run), stores their transitions and takes one minibatch gradient
+    step against a target network refreshed every `target_sync` iterations.
+    """
+    rng = np.random.default_rng(seed)
+    buffer = buffer or ReplayBuffer(max(100_000, 4 * env.n_arms), env.obs_size)
+    target_net = Perceptron(net.neurons)
+    target_net.copy_from(net)
+    rows = np.arange(batch_size)
+    obs = env.observation()
+    episodes = reached = 0
+    losses = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        eps = epsilon[0] + (epsilon[1] - epsilon[0]) * i / max(iterations - 1, 1)
+        actions = net(obs).argmax(axis=1)
+        explore = rng.random(env.n_arms) < eps
+        actions[explore] = rng.integers(0, env.n_actions, explore.sum())
+        next_obs, rewards, terminal, done = env.step(actions)
+        buffer.extend(obs, actions, rewards, next_obs, terminal)
+        episodes += int(done.sum())
+        reached += int(terminal.sum())
+        obs = env.observation()
+
+        if len(buffer) >= batch_size:
+            b = buffer.sample(batch_size, rng)
+            y = b.rewards + gamma * np.where(b.terminal, 0.0, target_net(b.next_obs).max(axis=1))
+            q, activations = net.forward(b.obs)
+            err = q[rows, b.actions] - y
+            grad = np.zeros_like(q)
+            grad[rows, b.actions] = np.clip(err, -1.0, 1.0) / batch_size
+            net.update(net.backward(activations, grad))
+            a = np.abs(err)
+            losses.append(float(np.where(a < 1.0, 0.5 * a * a, a - 0.5).mean()))
+        if (i + 1) % target_sync == 0:
+            target_net.copy_from(net)
+            losses = losses[-target_sync:]
+    seconds = time.perf_counter() - start
+    loss = float(np.mean(losses)) if losses else float("nan")
+    return TrainStats(iterations * env.n_arms, seconds, episodes, reached, loss)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train a Q-network policy for an arm")
+    parser.add_argument("points", nargs="+", type=parse_point, help="joint positions x,y, base first")
+    parser.add_argument("--absolute", action="store_true", help="angles are absolute link headings (playground.py)")
+    parser.add_argument("--arms", type=int, default=256, help="arms stepped together")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--hidden", type=int, nargs="+", default=[64, 64])
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--out", default="policy.npz")
+    args = parser.parse_args()
+
+    chain = Chain.from_points(args.points, cumulative=not args.absolute)
+    env = ArmEnv(chain, args.arms, args.seed)
+    net = Perceptron([env.obs_size, *args.hidden, env.n_actions], seed=args.seed)
+    stats = train_dqn(env, net, args.iterations, seed=args.seed)
+    net.save(args.out)
+    print(f"{args.out}: {stats.steps / stats.seconds:,.0f} env steps/s, "
+          f"{stats.reached}/{stats.episodes} episodes reached, loss {stats.loss:.4f}")
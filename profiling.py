@@ -0,0 +1,144 @@
+import json
+import time
+
+# Histogram buckets split every power of two of nanoseconds into this many
+SUBBUCKETS = 4
+_SHIFT = SUBBUCKETS.bit_length() - 1
+BUCKETS = 64 * SUBBUCKETS
+
+
+def _bucket(ns) -> int:
+    bits = ns.bit_length()
+    if bits <= _SHIFT:
+        return ns
+    return (bits - _SHIFT) * SUBBUCKETS + ((ns >> (bits - _SHIFT - 1)) & (SUBBUCKETS - 1))
+
+
+def _bucket_value(index) -> float:
+    """Midpoint, in ns, of the durations falling into a bucket."""
+    if index < SUBBUCKETS:
+        return float(index)
+    octave, sub = divmod(index, SUBBUCKETS)
+    low = (SUBBUCKETS + sub) << (octave - 1)
+    return low + (1 << (octave - 1)) / 2
+
+
+class Histogram:
+    """Durations of one phase in log-spaced buckets, about 12% wide."""
+
+    def __init__(self) -> None:
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, ns) -> None:
+        self.counts[_bucket(ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, q) -> float:
+        """Approximate q-th percentile, in ns."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if c and seen >= rank:
+                return min(_bucket_value(i), float(self.max))
+        return float(self.max)
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter_ns() - self.start)
+
+
+class _Off:
+    # Shared by every phase while profiling is disabled
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_OFF = _Off()
+
+
+class Profiler:
+    """Per-phase monotonic timers aggregated into histograms.
+
+    Wrap code in `with profiler.phase("name"):`. While disabled, phase()
+    hands back one shared no-op context, so the instrumentation can stay in
+    the loop. enable()/disable() switch it at any time.
+    """
+
+    def __init__(self, enabled=False) -> None:
+        self.enabled = enabled
+        self.histograms = {}
+        self.phases = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def toggle(self) -> None:
+        self.enabled = not self.enabled
+
+    def reset(self) -> None:
+        self.histograms.clear()
+
+    def phase(self, name):
+        if not self.enabled:
+            return _OFF
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = _Phase(self, name)
+        return phase
+
+    def record(self, name, ns) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(ns)
+
+    def summary(self) -> dict:
+        """{phase: {count, total_ms, mean_us, p50_us, p99_us, max_us}}, slowest total first."""
+        rows = {}
+        for name, h in sorted(self.histograms.items(), key=lambda kv: -kv[1].total):
+            rows[name] = {
+                "count": h.count,
+                "total_ms": h.total / 1e6,
+                "mean_us": h.total / h.count / 1e3,
+                "p50_us": h.percentile(50) / 1e3,
+                "p99_us": h.percentile(99) / 1e3,
+                "max_us": h.max / 1e3,
+            }
+        return rows
+
+    def report(self) -> str:
+        lines = [f"{'phase':<20}{'count':>10}{'total ms':>12}{'p50 us':>10}{'p99 us':>10}{'max us':>10}"]
+        for name, r in self.summary().items():
+            lines.append(f"{name:<20}{r['count']:>10}{r['total_ms']:>12.1f}"
+                         f"{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}{r['max_us']:>10.1f}")
+        return "\n".join(lines)
+
+    def export(self, path) -> None:
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=1)
@@ -0,0 +1,104 @@
+import re
+
+# Smallest chunk added when the tape grows, later growth doubles the buffer
+MIN_GROW = 64
+
+
+class Tape:
+    """Growable tape of small-int symbols backed by a single bytearray.
+
+    Cells are addressed by logical position, 0 being where the input starts.
+    `origin` is the physical index of position 0 and `head` is a physical
+    index, so the engine can index `cells` directly in its hot loop and only
+    call `grow_left`/`grow_right` when the head steps off the buffer.
+    Both ends grow geometrically, which keeps walking off either side
+    amortized O(1) per cell.
+    """
+
+    def __init__(self, data=b"", blank=0) -> None:
+        self.blank = blank
+        self.cells = bytearray(data) or bytearray([blank])
+        self.origin = 0
+        self.head = 0
+        self._nonblank = re.compile(b"[^" + re.escape(bytes([blank])) + b"]")
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    @property
+    def position(self) -> int:
+        return self.head - self.origin
+
+    @property
+    def symbol(self) -> int:
+        return self.cells[self.head]
+
+    def _chunk(self, need) -> int:
+        return max(need, len(self.cells), MIN_GROW)
+
+    def _resize(self, index, n) -> None:
+        try:
+            self.cells[index:index] = bytes([self.blank]) * n
+        except BufferError:
+            raise BufferError("The tape cannot grow while a view() or trimmed() of it is held, "
+                              "release the view first") from None
+
+    def grow_left(self, need=1) -> int:
+        """Prepend blank cells, returns the shift applied to physical indices.
+
+        Raises BufferError, leaving the tape unchanged, while a view is held.
+        """
+        n = self._chunk(need)
+        self._resize(0, n)
+        self.origin += n
+        self.head += n
+        return n
+
+    def grow_right(self, need=1) -> int:
+        """Append blank cells, returns how many were added (BufferError as grow_left)."""
+        n = self._chunk(need)
+        self._resize(len(self.cells), n)
+        return n
+
+    def _index(self, pos) -> int:
+        i = self.origin + pos
+        if i < 0:
+            i += self.grow_left(-i)
+        elif i >= len(self.cells):
+            self.grow_right(i - len(self.cells) + 1)
+        return i
+
+    def __getitem__(self, pos) -> int:
+        i = self.origin + pos
+        if 0 <= i < len(self.cells):
+            return self.cells[i]
+        return self.blank
+
+    def __setitem__(self, pos, symbol) -> None:
+        self.cells[self._index(pos)] = symbol
+
+    def move_to(self, pos) -> None:
+        self.head = self._index(pos)
+
+    def bounds(self):
+        """Logical [start, end) span of non-blank cells, (0, 0) if the tape is blank."""
+        first = self._nonblank.search(self.cells)
+        if first is None:
+            return (0, 0)
+        # Greedy scan for the last non-blank cell, without copying the buffer
+        last = re.compile(b"(?s).*" + self._nonblank.pattern).match(self.cells, first.start())
+        return (first.start() - self.origin, last.end() - self.origin)
+
+    def view(self, start=None, end=None) -> memoryview:
+        """Zero-copy view over logical positions [start, end), defaults to the whole buffer.
+
+        The buffer cannot grow while the view exists: release() it (or let it
+        go) before the tape is stepped again, or growth raises BufferError.
+        """
+        lo = 0 if start is None else max(self.origin + start, 0)
+        hi = len(self.cells) if end is None else min(self.origin + end, len(self.cells))
+        return memoryview(self.cells)[lo:max(lo, hi)]
+
+    def trimmed(self) -> memoryview:
+        """Zero-copy view of the non-blank part of the tape, released like view()'s."""
+        return self.view(*self.bounds())
@@ -0,0 +1,159 @@
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING}
+LEVEL_NAMES = {v: k for k, v in LEVELS.items()}
+
+# Records waiting for the writer thread; emit() drops rather than block once full
+QUEUE_SIZE = 1 << 16
+# Seconds the writer thread sleeps between looking at the queue
+POLL_SECONDS = 0.05
+
+
+def _plain(value):
+    # numpy scalars and arrays, without importing numpy here
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+class TextSink:
+    """Human-readable lines: time, level, event and key=value fields."""
+
+    def __init__(self, stream=None) -> None:
+        self.stream = stream or sys.stdout
+
+    def write(self, records) -> None:
+        lines = []
+        for t, level, event, fields in records:
+            text = " ".join(f"{k}={json.dumps(v, default=_plain)}" for k, v in fields.items())
+            lines.append(f"{t:.3f} {LEVEL_NAMES.get(level, level)} {event} {text}\n")
+        self.stream.write("".join(lines))
+        self.stream.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class JsonLinesSink:
+    """One JSON object per record, appended to `path`."""
+
+    def __init__(self, path) -> None:
+        self.file = open(path, "a")
+
+    def write(self, records) -> None:
+        self.file.write("".join(
+            json.dumps({"t": t, "level": LEVEL_NAMES.get(level, level), "event": event, **fields},
+                       default=_plain) + "\n"
+            for t, level, event, fields in records
+        ))
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _Channel:
+    __slots__ = ("every", "interval", "seen", "ready")
+
+    def __init__(self, every, max_rate) -> None:
+        self.every = every
+        self.interval = 1.0 / max_rate if max_rate else None
+        self.seen = 0
+        # Earliest time the next record may pass, up to a second of burst allowed
+        self.ready = 0.0
+
+
+class Telemetry:
+    """Structured, non-blocking event channel for simulation loops.
+
+    emit() filters by level, keeps every `every`-th record of an event and
+    holds each event under `max_rate` records per second (bursts of up to
+    a second's worth pass), then appends the record to a deque (atomic, no
+    lock). A daemon thread wakes every POLL_SECONDS to format and write
+    what has piled up. When the queue is full records are dropped and
+    counted in `dropped`, so the caller never waits on I/O. Per-event
+    settings come from configure(). Fields are formatted later on the
+    writer thread, so pass copies of anything the loop keeps mutating.
+    """
+
+    def __init__(self, sink=None, level=INFO, every=1, max_rate=None, queue_size=QUEUE_SIZE) -> None:
+        self.sink = sink or TextSink()
+        self.level = level
+        self.every = every
+        self.max_rate = max_rate
+        self.channels = {}
+        self.dropped = 0
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.closing = threading.Event()
+        self.thread = threading.Thread(target=self._drain, name="telemetry", daemon=True)
+        self.thread.start()
+
+    def configure(self, event, every=1, max_rate=None) -> None:
+        self.channels[event] = _Channel(every, max_rate)
+
+    def enabled(self, level) -> bool:
+        return level >= self.level
+
+    def emit(self, level, event, **fields) -> None:
+        if level < self.level:
+            return
+        channel = self.channels.get(event)
+        if channel is None:
+            channel = self.channels[event] = _Channel(self.every, self.max_rate)
+        if channel.every > 1:
+            channel.seen += 1
+            if channel.seen % channel.every:
+                return
+        if channel.interval is not None:
+            now = time.monotonic()
+            if now < channel.ready:
+                return
+            channel.ready = max(channel.ready, now - 1.0) + channel.interval
+        if len(self.queue) >= self.queue_size:
+            self.dropped += 1
+            return
+        self.queue.append((time.time(), level, event, fields))
+
+    def debug(self, event, **fields) -> None:
+        if DEBUG >= self.level:
+            self.emit(DEBUG, event, **fields)
+
+    def info(self, event, **fields) -> None:
+        if INFO >= self.level:
+            self.emit(INFO, event, **fields)
+
+    def warning(self, event, **fields) -> None:
+        if WARNING >= self.level:
+            self.emit(WARNING, event, **fields)
+
+    def _drain(self) -> None:
+        while True:
+            closing = self.closing.wait(POLL_SECONDS)
+            records = []
+            while self.queue:
+                records.append(self.queue.popleft())
+            if records:
+                self.sink.write(records)
+            if closing:
+                return
+
+    def close(self) -> None:
+        """Write out everything queued so far and close the sink."""
+        if self.thread.is_alive():
+            self.closing.set()
+            self.thread.join()
+            self.sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,7 +1,11 @@
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 
+from wavefield import WaveSolver, agent_strip
+from waverun import load_checkpoint, save_checkpoint
+
 # Grid size
 size = 100  # 100x100 grid
 c = 3.0  # Wave speed
@@ -14,11 +18,7 @@ smooth_factor = 0.9
 previous_direction = None
 
 # Initialize wave state
-def ripple_wave():
-    return np.zeros((size, size))
-
-current = ripple_wave()
-previous = np.copy(current)
+solver = WaveSolver((size, size), c, dt, dx, damping, sparse=True)  # Quiet cells cost nothing
 
 agent_x, agent_y = size // 2, size // 2  # Default ripple origin
 observer_x, observer_y = 50, 50  # Observer at origin
@@ -28,8 +28,17 @@ detection_time = None  # Track first detection time
 angles = []  # Store detected wave directions
 frames = []  # Store frame numbers
 
+# 'c' saves everything here; pass the file as the first argument to resume from it
+CHECKPOINT = "timeleap-checkpoint.npz"
+if len(sys.argv) > 1:
+    solver, _, state = load_checkpoint(sys.argv[1])
+    observer_x, observer_y = state["observer"]
+    agent_x, agent_y = state["agent"]
+    previous_direction = state["previous_direction"]
+    detection_time = state["detection_time"]
+
 def on_key(event):
-    global observer_x, observer_y, agent_x, agent_y, current
+    global observer_x, observer_y, agent_x, agent_y
     if event.key == 'up' and observer_y > 0:
         observer_y -= 1
     elif event.key == 'down' and observer_y < size - 1:
@@ -49,39 +58,37 @@ def on_key(event):
             agent_x += 1
         
         # Generate a wave across the agent's length
-        for i in range(-agent_length // 2, agent_length // 2 + 1):
-            if 0 <= agent_x + i < size:
-                current[agent_y, agent_x + i] = 1
+        solver.seed(*agent_strip(agent_x, agent_y, size, agent_length))
     elif event.key == 's':
         return  # Prevent save dialog by doing nothing on 's' key
+    elif event.key == 'c':
+        save_checkpoint(CHECKPOINT, solver, extra={
+            "observer": [observer_x, observer_y], "agent": [agent_x, agent_y],
+            "previous_direction": None if previous_direction is None else float(previous_direction),
+            "detection_time": detection_time,
+        })
+        print(f"Checkpoint saved to {CHECKPOINT} at step {solver.time}")
+        return
     print(f"Observer at ({observer_x}, {observer_y}), Agent at ({agent_x}, {agent_y})")
 
 fig, ax = plt.subplots(figsize=(6, 6))
-cmap = ax.imshow(current, cmap='coolwarm', vmin=-1, vmax=1)
+cmap = ax.imshow(solver.current, cmap='coolwarm', vmin=-1, vmax=1)
 observer_dot, = ax.plot(observer_x, observer_y, 'ro', markersize=5)  # Red dot for observer
 direction_line, = ax.plot([], [], 'g-', linewidth=2)  # Green line for direction
 fig.canvas.mpl_connect('key_press_event', on_key)
 
 def update(frame):
-    global current, previous, detection_time, previous_direction
-    next_grid = np.copy(current)
-    
-    # Apply the 2D wave equation (finite difference method) with damping
-    laplacian = (
-        np.roll(current, 1, axis=0) + np.roll(current, -1, axis=0) +
-        np.roll(current, 1, axis=1) + np.roll(current, -1, axis=1) - 4 * current
-    )
-    next_grid = damping * (2 * current - previous + (c**2 * dt**2 / dx**2) * laplacian)
+    global detection_time, previous_direction
+    current = solver.current
     
     # Check if any disturbance is detected by the observer
     if abs(current[observer_y, observer_x]) > 0.001:  # Threshold to ignore small disturbances
         if detection_time is None:
             detection_time = frame  # Set the time of first detection
         
-        # Compute tangential direction to the wavefront using gradients
-        grad_x = -(np.roll(current, -1, axis=1) - np.roll(current, 1, axis=1)) / 2.0
-        grad_y = -(np.roll(current, -1, axis=0) - np.roll(current, 1, axis=0)) / 2.0
-        best_dx, best_dy = grad_x[observer_y, observer_x], grad_y[observer_y, observer_x]
+        # Compute tangential direction to the wavefront using the (wrapping) gradient at the observer
+        best_dx = -(current[observer_y, (observer_x + 1) % size] - current[observer_y, observer_x - 1]) / 2.0
+        best_dy = -(current[(observer_y + 1) % size, observer_x] - current[observer_y - 1, observer_x]) / 2.0
         
         direction = np.arctan2(best_dy, best_dx)  # Direction in radians
         
@@ -97,9 +104,9 @@ def update(frame):
         end_y = observer_y - 5 * np.sin(direction)
         direction_line.set_data([observer_x, end_x], [observer_y, end_y])
     
-    previous = np.copy(current)
-    current = np.copy(next_grid)
-    cmap.set_array(current)
+    # Apply the 2D wave equation (finite difference method) with damping
+    solver.step()
+    cmap.set_array(solver.current)
     observer_dot.set_data(observer_x, observer_y)
     
     return [cmap, observer_dot, direction_line]
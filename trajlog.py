@@ -0,0 +1,72 @@
+import csv
+import os
+import time
+
+# Columns of the target-(x, y)-def-mach-config.csv arm logs
+ARM_COLUMNS = ["X0", "Y0", "X1", "Y1", "XF", "YF", "Angle0", "Angle1", "TargetX", "TargetY"]
+
+# Buffered rows are written once there are this many, or this many seconds passed
+FLUSH_ROWS = 1024
+FLUSH_SECONDS = 1.0
+
+
+def _last_row(path, tail=4096):
+    """Last CSV row of `path` read from its tail, None for a missing or empty file."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - tail))
+            lines = f.read().decode().splitlines()
+    except FileNotFoundError:
+        return None
+    lines = [line for line in lines if line.strip()]
+    return next(csv.reader(lines[-1:]), None)
+
+
+class TrajectoryWriter:
+    """Append-only CSV log that stays open and skips consecutive duplicate rows.
+
+    Rows are buffered and written in batches, so appending costs the same
+    whatever the size of the file. Call close() (or use it as a context
+    manager) to flush what is left.
+    """
+
+    def __init__(self, path, headers=ARM_COLUMNS, flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        # Compare as text so rows already in the file also count as duplicates
+        self.last_row = _last_row(path)
+        self.file = open(path, "a", newline="")
+        self.writer = csv.writer(self.file)
+        if self.last_row is None:
+            self.writer.writerow(headers)
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def append(self, row):
+        text = [str(v) for v in row]
+        if text == self.last_row:
+            return  # Avoid appending duplicate last value
+        self.last_row = text
+        self.buffer.append(text)
+        if len(self.buffer) >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        self.writer.writerows(self.buffer)
+        self.buffer.clear()
+        self.file.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
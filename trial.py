@@ -1,8 +1,15 @@
+import argparse
+import os
 import pygame 
-import csv
-from math import sin, cos, sqrt, radians
+import numpy as np
+from math import sqrt
 from random import random
 
+from config_index import ConfigIndex
+from kinematics import Chain
+from telemetry import Telemetry
+from trajlog import TrajectoryWriter
+
 
 # Colors
 RED = (255, 0, 0)
@@ -10,33 +17,13 @@ WHITE = (255, 255, 255)
 BLUE = (0, 0, 255)
 GREEN = (0, 255, 0)
 
-# Function to append to CSV
-def append_file(writer, headers, data):
-    file_exists = False
-    try:
-        with open(writer, 'r') as csvfile:
-            rows = list(csv.reader(csvfile))
-            file_exists = bool(rows)
-            last_row = rows[-1] if rows else None
-    except FileNotFoundError:
-        last_row = None
-    
-    if last_row and last_row == data:
-        return  # Avoid appending duplicate last value
-    
-    with open(writer, 'a', newline='') as csvfile:
-        csv_writer = csv.writer(csvfile)
-        if not file_exists:
-            csv_writer.writerow(headers)
-        csv_writer.writerow(data)
-
 # Function to calculate distance
 def distance(coord1, coord2):
     return sqrt((coord1[0] - coord2[0])**2 + (coord1[1] - coord2[1])**2)
 
 # Playground Class
 class Playground(): 
-    def __init__(self, winsize=(900, 600)):
+    def __init__(self, winsize=(900, 600), index=None, neighbours=4):
         pygame.init()  # Initialize pygame first
         self.font = pygame.font.Font(None, 36)  # Load font AFTER pygame.init()
         self.winsize = winsize
@@ -44,6 +31,12 @@ class Playground():
         pygame.display.set_caption("Machine Target Simulation")
         self.target = None
         self.geometry = None
+        self.chain = None
+        self.log = None
+        self.index = index  # optional ConfigIndex of known configurations, in degrees
+        self.neighbours = neighbours
+        self.telemetry = Telemetry()
+        self.telemetry.configure("step", max_rate=10)
         self.angles = [0, 0, 0]  # Individual angles for each joint
         self.state = "Initiating Controllable"
         self.q_table = {
@@ -65,26 +58,10 @@ class Playground():
         for i in range(len(self.angles)):
             self.angles[i] %= 360  # Keep angles within 0-360 degrees
         
-        # Set base joint (first point remains fixed)
-        base_x, base_y = self.geometry[0][1]
-
-        # Reset first joint position
-        self.geometry[0][1] = [base_x, base_y]
-
-        cumulative_angle = 0  # This keeps track of the sum of angles
-        for i in range(len(self.geometry) - 1):
-            cumulative_angle += self.angles[i]  # Add the angle of the current joint
-            
-            angle_rad = radians(cumulative_angle)  # Convert to radians
-            
-            # Get length of current segment
-            length = distance(self.geometry[i][1], self.geometry[i + 1][1])
-            
-            # Calculate new position of next joint
-            new_x = self.geometry[i][1][0] + length * cos(angle_rad)
-            new_y = self.geometry[i][1][1] + length * sin(angle_rad)
-            
-            self.geometry[i + 1][1] = [new_x, new_y]
+        # Joint positions from the fixed link lengths, angles accumulate along the arm
+        points = self.chain.positions(np.radians(self.angles))
+        for i in range(1, len(self.geometry)):
+            self.geometry[i][1] = points[i].tolist()
 
         # Draw lines and joints
         for i in range(len(self.geometry) - 1):
@@ -94,6 +71,15 @@ class Playground():
         pygame.draw.circle(self.screen, GREEN, self.geometry[-1][1], 5)
 
 
+    def warm_start(self):
+        """Start from the indexed configuration whose arm ends closest to the target."""
+        if self.index is None or not len(self.index) or self.target is None:
+            return
+        _, angles, _ = self.index.nearest(self.target, self.neighbours)
+        ends = self.chain.end_effector(np.radians(angles))
+        best = angles[np.argmin(np.linalg.norm(ends - np.asarray(self.target, dtype=float), axis=1))]
+        self.angles[:self.chain.n_links] = best.tolist()
+
     def reset_env(self,counter,mod):
         if counter%mod==0:
             self.angles[0] = int(random()*360)
@@ -103,8 +89,10 @@ class Playground():
     def calculate_q_table(self):
         if distance(self.geometry[-1][-1],self.target)<self.q_table["Loss"]:
             self.q_table["Loss"] = distance(self.geometry[-1][-1],self.target)
-            self.q_table["Angles"] = self.angles
-            print("updated")
+            self.q_table["Angles"] = self.angles[:]  # Copy, reset_env changes the list in place
+            self.telemetry.info("updated", loss=self.q_table["Loss"], angles=self.angles[:])
+            if self.index is not None:
+                self.index.insert(self.geometry[-1][1], self.angles)
             self.state = f"{self.q_table["Loss"]}"
             
     def run(self):
@@ -112,6 +100,9 @@ class Playground():
         running = True
         FPS = 120
         counter = 0
+        if self.target:
+            self.log = TrajectoryWriter(f"target-{self.target}-def-mach-config.csv")
+        self.warm_start()
         
         while running:             
             clock.tick(FPS)
@@ -149,15 +140,13 @@ class Playground():
             text_rect = text.get_rect(center=(700, 25))  
             self.screen.blit(text, text_rect) 
 
-            print(self.angles, self.q_table)
+            self.telemetry.debug("step", counter=counter, angles=self.angles[:], loss=self.q_table["Loss"])
             
                 
 
             # Append data to file
-            if self.geometry and self.target:
-                append_file(
-                    f"target-{self.target}-def-mach-config.csv",
-                    ["X0", "Y0", "X1", "Y1", "XF", "YF", "Angle0", "Angle1", "TargetX", "TargetY"],
+            if self.log is not None and self.geometry:
+                self.log.append(
                     [self.geometry[0][1][0], self.geometry[0][1][1], 
                      self.geometry[1][1][0], self.geometry[1][1][1], 
                      self.geometry[2][1][0], self.geometry[2][1][1], 
@@ -166,6 +155,9 @@ class Playground():
 
             pygame.display.flip()
         
+        if self.log is not None:
+            self.log.close()
+        self.telemetry.close()
         pygame.quit()
     
     def set_target(self, point):
@@ -173,6 +165,9 @@ class Playground():
 
     def set_machine(self, geometry):
         self.geometry = geometry
+        self.chain = Chain.from_points([p for _, p in geometry], cumulative=True)
+        if self.index is not None:
+            self.index.match_chain(self.chain)
 
 
 def main():
@@ -181,10 +176,28 @@ def main():
         [RED, [300, 300]],
         [RED, [300, 200]],
     ]
-    env = Playground()
+    parser = argparse.ArgumentParser(description="Machine target simulation")
+    parser.add_argument("--index", help="config_index.py index (e.g. built from the target-*.csv logs) "
+                                        "warm-starting the search, extended and saved by the run")
+    args = parser.parse_args()
+
+    index = None
+    if args.index and os.path.exists(args.index):
+        try:
+            index = ConfigIndex.load(args.index)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.index:
+        index = ConfigIndex(len(mach_config) - 1, cumulative=True)
+    env = Playground(index=index)
     env.set_target(point=(225, 225))
-    env.set_machine(mach_config)
+    try:
+        env.set_machine(mach_config)
+    except ValueError as e:
+        parser.error(str(e))
     env.run()
+    if index is not None:
+        index.save(args.index)
 
 # Run the simulation
 if __name__ == "__main__":
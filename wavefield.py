@@ -0,0 +1,281 @@
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+# timeleap.py defaults
+C = 3.0  # Wave speed
+DT = 0.1  # Time step
+DX = 1.0  # Grid spacing
+DAMPING = 0.995  # Damping factor to simulate viscosity
+THRESHOLD = 0.001  # Amplitude an observer counts as a disturbance
+SMOOTH_FACTOR = 0.9  # Weight of the previous direction when smoothing
+AGENT_LENGTH = 5  # Width of the strip a timeleap agent disturbs
+# Cells per row band of a TiledWaveSolver, small enough for a band's arrays to stay in cache
+BAND_CELLS = 1 << 15
+
+
+class _Grid:
+    """One padded state buffer and the views the stencil reads from it."""
+
+    def __init__(self, shape, dtype) -> None:
+        h, w = shape
+        self.padded = np.zeros((h + 2, w + 2), dtype=dtype)
+        p = self.padded
+        self.interior = p[1:-1, 1:-1]
+        # np.roll(grid, 1, axis=0) is the row above, and so on
+        self.up = p[:-2, 1:-1]
+        self.down = p[2:, 1:-1]
+        self.left = p[1:-1, :-2]
+        self.right = p[1:-1, 2:]
+        # Halo cells and the interior edges they wrap around to
+        self.halo = ((p[0, 1:-1], p[-2, 1:-1]), (p[-1, 1:-1], p[1, 1:-1]),
+                     (p[1:-1, 0], p[1:-1, -2]), (p[1:-1, -1], p[1:-1, 1]))
+
+    def fill_halo(self) -> None:
+        for halo, edge in self.halo:
+            halo[...] = edge
+
+
+class WaveSolver:
+    """Damped 2D wave equation on a periodic grid, stepped without allocating.
+
+    Three padded buffers hold the previous, current and next states and
+    are rotated after each step; the 5-point Laplacian reads shifted views
+    of the current buffer once its one-cell halo is filled from the
+    opposite edges, which matches np.roll's wrap-around. The arithmetic
+    runs in the same order as timeleap.py's original expression, so the
+    results are bit-identical to it.
+
+    With `sparse`, only a bounding box around the cells that may be non-zero
+    is computed: a zero neighbourhood stays exactly zero, so the box grows by
+    one cell per step. Once it reaches an edge the wrap-around makes the
+    whole grid live and the solver goes dense for good. Disturbances must go
+    through seed() in this mode so the box knows about them.
+    """
+
+    def __init__(self, shape, c=C, dt=DT, dx=DX, damping=DAMPING, dtype=np.float64, sparse=False) -> None:
+        self.shape = tuple(shape)
+        self.c, self.dt, self.dx = c, dt, dx
+        self.k = c**2 * dt**2 / dx**2
+        self.damping = damping
+        self.grids = [_Grid(self.shape, dtype) for _ in range(3)]  # previous, current, next
+        self.scratch = np.zeros(self.shape, dtype=dtype)
+        self.time = 0
+        self.sparse = sparse
+        self.region = None  # (y0, y1, x0, x1) holding every non-zero cell, None while all zero
+
+    @property
+    def previous(self) -> np.ndarray:
+        return self.grids[0].interior
+
+    @property
+    def current(self) -> np.ndarray:
+        return self.grids[1].interior
+
+    def fill_halo(self) -> None:
+        """Make the current buffer's halo match its opposite edges (step() does this itself)."""
+        self.grids[1].fill_halo()
+
+    def seed(self, xs, ys, value=1.0) -> None:
+        """Set cells of the current state, growing the active region around them."""
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        self.current[ys, xs] = value
+        if not xs.size:
+            return
+        box = (int(ys.min()), int(ys.max()) + 1, int(xs.min()), int(xs.max()) + 1)
+        if self.region is not None:
+            y0, y1, x0, x1 = self.region
+            box = (min(y0, box[0]), max(y1, box[1]), min(x0, box[2]), max(x1, box[3]))
+        self.region = box
+
+    def active(self):
+        """Grow the region for the coming step, returns (rows, cols) to compute or None if all zero."""
+        everything = (slice(None), slice(None))
+        if not self.sparse:
+            return everything
+        if self.region is None:
+            return None
+        y0, y1, x0, x1 = self.region
+        h, w = self.shape
+        if y0 == 0 or x0 == 0 or y1 == h or x1 == w:
+            self.sparse = False
+            return everything
+        self.region = (y0 - 1, y1 + 1, x0 - 1, x1 + 1)
+        return slice(y0 - 1, y1 + 1), slice(x0 - 1, x1 + 1)
+
+    def advance(self, rows, cols=slice(None)) -> None:
+        """Compute the next state for one block of cells, the halo already filled."""
+        prev, cur, nxt = self.grids
+        s, out, c = self.scratch[rows, cols], nxt.interior[rows, cols], cur.interior[rows, cols]
+        # laplacian = up + down + left + right - 4 * current
+        np.add(cur.up[rows, cols], cur.down[rows, cols], out=s)
+        s += cur.left[rows, cols]
+        s += cur.right[rows, cols]
+        np.multiply(c, 4, out=out)
+        s -= out
+        s *= self.k
+        # next = damping * (2 * current - previous + k * laplacian)
+        np.multiply(c, 2, out=out)
+        out -= prev.interior[rows, cols]
+        out += s
+        out *= self.damping
+
+    def rotate(self) -> None:
+        prev, cur, nxt = self.grids
+        self.grids = [cur, nxt, prev]
+        self.time += 1
+
+    def step(self, n=1) -> None:
+        for _ in range(n):
+            block = self.active()
+            if block is not None:
+                self.fill_halo()
+                self.advance(*block)
+            self.rotate()
+
+
+class TiledWaveSolver(WaveSolver):
+    """WaveSolver advancing row bands on a thread pool.
+
+    All bands read and write the same padded buffers: a band's halo rows are
+    simply its neighbours' edge rows, so the only exchange per step is the
+    periodic halo fill before the bands start. NumPy releases the GIL inside
+    the ufuncs, and the bands are sized to stay in cache. Each cell sees the
+    same operations as in WaveSolver, so the results are bit-identical.
+    Call close() (or use it as a context manager) to stop the threads.
+    """
+
+    def __init__(self, shape, c=C, dt=DT, dx=DX, damping=DAMPING, dtype=np.float64, sparse=False,
+                 workers=None, band_rows=None) -> None:
+        super().__init__(shape, c, dt, dx, damping, dtype, sparse)
+        height, width = self.shape
+        self.workers = workers or os.cpu_count() or 1
+        band_rows = band_rows or max(1, min(BAND_CELLS // max(width, 1), -(-height // self.workers)))
+        self.bands = [slice(r, min(r + band_rows, height)) for r in range(0, height, band_rows)]
+        self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="wave")
+
+    def step(self, n=1) -> None:
+        height = self.shape[0]
+        for _ in range(n):
+            block = self.active()
+            if block is not None:
+                self.fill_halo()
+                rows, cols = block
+                start, stop, _ = rows.indices(height)
+                # Bands overlapping the active rows, cut down to them
+                parts = [slice(max(b.start, start), min(b.stop, stop)) for b in self.bands
+                         if b.stop > start and b.start < stop]
+                # list() waits for every band before the buffers rotate
+                list(self.pool.map(self.advance, parts, [cols] * len(parts)))
+            self.rotate()
+
+    def close(self) -> None:
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Arrivals(NamedTuple):
+    time: np.ndarray  # first frame each observer saw a disturbance, -1 if never
+    direction: np.ndarray  # smoothed direction the wave arrived from in radians, nan if never
+
+
+class ObserverArray:
+    """timeleap.py's observer test and direction estimate, for many observers at once.
+
+    Each observe() call gathers every observer's cell from the padded
+    current buffer in one take(); observers over the threshold get the
+    wrapping central-difference gradient direction, blended with their
+    previous direction by `smooth`.
+    """
+
+    def __init__(self, solver, xs, ys, threshold=THRESHOLD, smooth=SMOOTH_FACTOR) -> None:
+        self.solver = solver
+        self.width = solver.shape[1] + 2
+        self.xs, self.ys = np.asarray(xs, dtype=np.intp), np.asarray(ys, dtype=np.intp)
+        self.flat = (self.ys + 1) * self.width + (self.xs + 1)
+        self.threshold = threshold
+        self.smooth = smooth
+        self.time = np.full(len(self.flat), -1)
+        self.direction = np.full(len(self.flat), np.nan)
+
+    def observe(self, frame) -> None:
+        self.solver.fill_halo()
+        p = self.solver.grids[1].padded.ravel()
+        hit = np.flatnonzero(np.abs(p.take(self.flat)) > self.threshold)
+        if not len(hit):
+            return
+        f, w = self.flat[hit], self.width
+        grad_x = -(p[f + 1] - p[f - 1]) / 2.0
+        grad_y = -(p[f + w] - p[f - w]) / 2.0
+        direction = np.arctan2(grad_y, grad_x)
+        previous = self.direction[hit]
+        seen = ~np.isnan(previous)
+        direction[seen] = self.smooth * previous[seen] + (1 - self.smooth) * direction[seen]
+        self.direction[hit] = direction
+        first = hit[self.time[hit] < 0]
+        self.time[first] = frame
+
+    def arrivals(self) -> Arrivals:
+        return Arrivals(self.time.copy(), self.direction.copy())
+
+
+def agent_strip(x, y, width, length=AGENT_LENGTH):
+    """Cells (xs, ys) a timeleap agent at (x, y) disturbs, clipped to the grid."""
+    # Same cells as timeleap.py's range(-agent_length // 2, agent_length // 2 + 1)
+    xs = x + np.arange(-length // 2, length // 2 + 1)
+    xs = xs[(xs >= 0) & (xs < width)]
+    return xs, np.full(len(xs), y)
+
+
+def propagate(shape, sources, observers, steps, amplitude=1.0, threshold=THRESHOLD,
+              smooth=SMOOTH_FACTOR, sparse=True, **solver_kwargs) -> Arrivals:
+    """Run a wave headless and report when and from where it reached each observer.
+
+    `sources` and `observers` are (xs, ys) pairs of cell coordinate
+    arrays; source cells start at `amplitude`. Frames follow timeleap.py:
+    observers look at the grid, then it steps. With `sparse` frames cost in
+    proportion to the area the wave has reached.
+    """
+    solver = WaveSolver(shape, sparse=sparse, **solver_kwargs)
+    solver.seed(*sources, amplitude)
+    array = ObserverArray(solver, *observers, threshold=threshold, smooth=smooth)
+    for frame in range(steps):
+        array.observe(frame)
+        solver.step()
+    return array.arrivals()
+
+
+def parse_cell(text) -> tuple:
+    """Command-line "x,y" to integer grid coordinates, also used for "width,height"."""
+    x, y = text.split(",")
+    return int(x), int(y)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless wave propagation with a grid of observers")
+    parser.add_argument("--size", type=parse_cell, default=(100, 100), help="grid width,height")
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--agent", type=parse_cell, action="append", help="agent x,y seeding a strip, repeatable")
+    parser.add_argument("--spacing", type=int, default=5, help="observer grid spacing in cells")
+    parser.add_argument("--out", help="save arrival times and directions to this .npz")
+    args = parser.parse_args()
+
+    width, height = args.size
+    agents = args.agent or [(width // 2, height // 2)]
+    strips = [agent_strip(x, y, width) for x, y in agents]
+    sources = (np.concatenate([s[0] for s in strips]), np.concatenate([s[1] for s in strips]))
+    gx, gy = np.meshgrid(np.arange(0, width, args.spacing), np.arange(0, height, args.spacing))
+    result = propagate((height, width), sources, (gx.ravel(), gy.ravel()), args.steps)
+    reached = result.time >= 0
+    print(f"{reached.sum()}/{len(reached)} observers reached, median arrival frame "
+          f"{np.median(result.time[reached]) if reached.any() else float('nan')}")
+    if args.out:
+        np.savez(args.out, x=gx.ravel(), y=gy.ravel(), time=result.time, direction=result.direction)
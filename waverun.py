@@ -0,0 +1,242 @@
+import argparse
+import glob
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+from wavefield import ObserverArray, WaveSolver, agent_strip, parse_cell
+
+CHECKPOINT_VERSION = 1
+# Frames per compressed chunk file, and chunks that may wait for the writer thread
+CHUNK_FRAMES = 32
+QUEUE_CHUNKS = 4
+
+
+def _chunk_name(i) -> str:
+    return f"frames-{i:06d}.npz"
+
+
+def save_checkpoint(path, solver, observers=None, extra=None) -> None:
+    """Write the full solver (and observer) state to a compressed .npz, atomically."""
+    region = solver.region if solver.region is not None else ()
+    state = {
+        "version": CHECKPOINT_VERSION,
+        "shape": solver.shape, "c": solver.c, "dt": solver.dt, "dx": solver.dx,
+        "damping": solver.damping, "time": solver.time, "sparse": solver.sparse, "region": region,
+        "extra": json.dumps(extra or {}),
+        "previous": solver.previous, "current": solver.current,
+    }
+    if observers is not None:
+        state.update(
+            obs_x=observers.xs, obs_y=observers.ys, obs_time=observers.time, obs_direction=observers.direction,
+            obs_threshold=observers.threshold, obs_smooth=observers.smooth,
+        )
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **state)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path, solver_cls=WaveSolver, **solver_kwargs):
+    """Rebuild (solver, observers or None, extra dict) from save_checkpoint()."""
+    with np.load(path) as f:
+        if int(f["version"]) != CHECKPOINT_VERSION:
+            raise ValueError(f"{path}: unsupported checkpoint version {int(f['version'])}")
+        solver = solver_cls(tuple(f["shape"]), float(f["c"]), float(f["dt"]), float(f["dx"]), float(f["damping"]),
+                            f["current"].dtype, bool(f["sparse"]), **solver_kwargs)
+        solver.previous[...] = f["previous"]
+        solver.current[...] = f["current"]
+        solver.time = int(f["time"])
+        solver.region = tuple(int(v) for v in f["region"]) or None
+        observers = None
+        if "obs_x" in f:
+            observers = ObserverArray(solver, f["obs_x"], f["obs_y"], float(f["obs_threshold"]), float(f["obs_smooth"]))
+            observers.time[...] = f["obs_time"]
+            observers.direction[...] = f["obs_direction"]
+        extra = json.loads(str(f["extra"]))
+    return solver, observers, extra
+
+
+class FrameWriter:
+    """Streams frames into compressed chunk files from a background thread.
+
+    The directory holds frames-NNNNNN.npz files, each with a `frames`
+    array (n, height, width) and the solver `times` they were taken at.
+    add() only copies the frame into the chunk being filled; full chunks are
+    compressed and written by the thread. If it falls QUEUE_CHUNKS chunks
+    behind, whole chunks are dropped and counted in `dropped` rather than
+    stalling the caller. Reopening a directory appends after its chunks.
+    """
+
+    def __init__(self, path, shape, every=1, dtype=np.float32, chunk_frames=CHUNK_FRAMES) -> None:
+        self.path = path
+        self.every = every
+        os.makedirs(path, exist_ok=True)
+        self.next_chunk = len(glob.glob(os.path.join(path, "frames-*.npz")))
+        self.chunk_frames = chunk_frames
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self._new_chunk()
+        self.dropped = 0
+        self.queue = queue.Queue(QUEUE_CHUNKS)
+        self.thread = threading.Thread(target=self._drain, name="frames", daemon=True)
+        self.thread.start()
+
+    def _new_chunk(self) -> None:
+        self.frames = np.empty((self.chunk_frames,) + self.shape, dtype=self.dtype)
+        self.times = np.empty(self.chunk_frames, dtype=np.int64)
+        self.count = 0
+
+    def add(self, time, frame) -> None:
+        if time % self.every:
+            return
+        self.frames[self.count] = frame
+        self.times[self.count] = time
+        self.count += 1
+        if self.count == self.chunk_frames:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.count:
+            return
+        try:
+            self.queue.put_nowait((self.next_chunk, self.frames[:self.count], self.times[:self.count]))
+            self.next_chunk += 1
+        except queue.Full:
+            self.dropped += self.count
+        self._new_chunk()
+
+    def sync(self) -> None:
+        """Write out every frame added so far, even a partial chunk, and wait until it is on disk."""
+        if self.count:
+            self.queue.put((self.next_chunk, self.frames[:self.count], self.times[:self.count]))
+            self.next_chunk += 1
+            self._new_chunk()
+        self.queue.join()
+
+    def _drain(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            i, frames, times = item
+            name = os.path.join(self.path, _chunk_name(i))
+            with open(name + ".tmp", "wb") as f:
+                np.savez_compressed(f, frames=frames, times=times)
+            os.replace(name + ".tmp", name)
+            self.queue.task_done()
+
+    def close(self) -> None:
+        """Write out the partial chunk and wait for the thread."""
+        if self.thread.is_alive():
+            self.flush()
+            self.queue.put(None)
+            self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_frames(path):
+    """(times, frames) of a FrameWriter directory in time order.
+
+    Frames repeated by resuming from a checkpoint keep their latest copy.
+    """
+    times, frames = [], []
+    for name in sorted(glob.glob(os.path.join(path, "frames-*.npz"))):
+        with np.load(name) as f:
+            times.append(f["times"])
+            frames.append(f["frames"])
+    if not times:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0, 0))
+    times, frames = np.concatenate(times), np.concatenate(frames)
+    # np.unique keeps the first occurrence, so look from the end
+    _, last = np.unique(times[::-1], return_index=True)
+    keep = len(times) - 1 - last
+    return times[keep], frames[keep]
+
+
+class WaveRun:
+    """Drives a solver and its observers, checkpointing and exporting frames as it goes.
+
+    Every `checkpoint_every` steps the state goes to `checkpoint`; with a
+    FrameWriter every step's frame is offered to it. resume() picks a run
+    up from its last checkpoint; frames exported before a checkpoint are
+    on disk by the time it is written.
+    """
+
+    def __init__(self, solver, observers=None, checkpoint=None, checkpoint_every=1000, frames=None,
+                 extra=None) -> None:
+        self.solver = solver
+        self.observers = observers
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.frames = frames
+        self.extra = extra or {}
+
+    @classmethod
+    def resume(cls, checkpoint, checkpoint_every=1000, frames=None, solver_cls=WaveSolver, **solver_kwargs):
+        solver, observers, extra = load_checkpoint(checkpoint, solver_cls, **solver_kwargs)
+        return cls(solver, observers, checkpoint, checkpoint_every, frames, extra)
+
+    def save(self) -> None:
+        if self.checkpoint:
+            # A resume starts from the checkpoint time, so earlier frames must be on disk first
+            if self.frames is not None:
+                self.frames.sync()
+            save_checkpoint(self.checkpoint, self.solver, self.observers, self.extra)
+
+    def run(self, steps) -> None:
+        """Advance `steps` frames (timeleap order: observe, export, step)."""
+        solver = self.solver
+        for _ in range(steps):
+            if self.observers is not None:
+                self.observers.observe(solver.time)
+            if self.frames is not None:
+                self.frames.add(solver.time, solver.current)
+            solver.step()
+            if self.checkpoint and solver.time % self.checkpoint_every == 0:
+                self.save()
+
+    def close(self) -> None:
+        self.save()
+        if self.frames is not None:
+            self.frames.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long wave runs with checkpoints and frame export")
+    parser.add_argument("--size", type=parse_cell, default=(100, 100), help="grid width,height")
+    parser.add_argument("--steps", type=int, default=100, help="steps to run (on top of a resumed checkpoint)")
+    parser.add_argument("--agent", type=parse_cell, action="append", help="agent x,y seeding a strip, repeatable")
+    parser.add_argument("--spacing", type=int, default=5, help="observer grid spacing in cells")
+    parser.add_argument("--checkpoint", default="wave-checkpoint.npz")
+    parser.add_argument("--checkpoint-every", type=int, default=1000)
+    parser.add_argument("--resume", action="store_true", help="continue from --checkpoint")
+    parser.add_argument("--frames", help="directory receiving the exported frames")
+    parser.add_argument("--frame-every", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.resume:
+        run = WaveRun.resume(args.checkpoint, args.checkpoint_every)
+    else:
+        width, height = args.size
+        solver = WaveSolver((height, width), sparse=True)
+        for x, y in args.agent or [(width // 2, height // 2)]:
+            solver.seed(*agent_strip(x, y, width))
+        gx, gy = np.meshgrid(np.arange(0, width, args.spacing), np.arange(0, height, args.spacing))
+        run = WaveRun(solver, ObserverArray(solver, gx.ravel(), gy.ravel()), args.checkpoint, args.checkpoint_every)
+    if args.frames:
+        run.frames = FrameWriter(args.frames, run.solver.shape, args.frame_every)
+    run.run(args.steps)
+    run.close()
+    reached = run.observers.time >= 0
+    print(f"t={run.solver.time}: {reached.sum()}/{len(reached)} observers reached"
+          + (f", {run.frames.dropped} frames dropped" if run.frames is not None and run.frames.dropped else ""))